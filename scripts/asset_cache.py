@@ -0,0 +1,116 @@
+import glob
+import hashlib
+import os
+import struct
+import zlib
+
+import pygame
+
+from sprites import SpriteSheetRegistry
+
+class AssetCache:
+    """
+    On-disk cache of sliced (and optionally scaled) sprite frames.
+
+    Each sprite definition is stored in its own file named
+    <definition hash>-<source file hash>.bin, holding a small header followed by
+    the zlib-compressed RGBA bytes of all frames stacked vertically. Editing the
+    source image changes its hash, so stale entries are never read and are
+    deleted the next time the definition is written.
+    """
+    MAGIC = b"TDAC"
+    VERSION = 1
+    HEADER = struct.Struct("<4sHIII")  # magic, version, frame count, frame width, frame height
+
+    def __init__(self, cache_dir=".cache/assets", enabled=True, sheets=None):
+        """
+        Initialize the cache.
+        :param cache_dir: Directory holding the cache files.
+        :param enabled: When False every load decodes the source image.
+        :param sheets: SpriteSheetRegistry used to decode sources on a miss, e.g. SpriteManager.sheets.
+        """
+        self.cache_dir = cache_dir
+        self.enabled = enabled
+        self.file_hashes = {}  # path -> (mtime, size, hash), so each source is hashed once
+        self.sheets = sheets if sheets is not None else SpriteSheetRegistry()
+        self.hits = 0
+        self.misses = 0
+
+    def file_hash(self, path):
+        """Return the hash of a source file's contents."""
+        stat = os.stat(path)
+        cached = self.file_hashes.get(path)
+        if cached is not None and cached[:2] == (stat.st_mtime, stat.st_size):
+            return cached[2]
+        with open(path, "rb") as file:
+            digest = hashlib.sha1(file.read()).hexdigest()
+        self.file_hashes[path] = (stat.st_mtime, stat.st_size, digest)
+        return digest
+
+    def load_frames(self, image_path, x, y, width, height, scale=1.0, sprites_per_row=1, rows=1):
+        """
+        Return the frames of a sprite definition, from the cache when it is up to date.
+        Takes the same arguments as SpriteSheet.get_animation_frames plus the sheet path.
+        """
+        definition = repr((os.path.normpath(image_path), x, y, width, height, scale, sprites_per_row, rows))
+        definition_hash = hashlib.sha1(definition.encode()).hexdigest()[:16]
+        source_hash = self.file_hash(image_path)[:16]
+        cache_path = os.path.join(self.cache_dir, f"{definition_hash}-{source_hash}.bin")
+
+        if self.enabled:
+            frames = self.read(cache_path)
+            if frames is not None:
+                self.hits += 1
+                return frames
+
+        self.misses += 1
+        frames = self.sheets.get(image_path).get_animation_frames(x, y, width, height,
+                                                                 sprites_per_row, rows, scale)
+        if self.enabled:
+            self.write(cache_path, frames, stale_pattern=f"{definition_hash}-*.bin")
+        return frames
+
+    def read(self, cache_path):
+        """Read the frames stored in a cache file, or None if it is missing or unreadable."""
+        try:
+            with open(cache_path, "rb") as file:
+                data = file.read()
+            magic, version, count, width, height = self.HEADER.unpack_from(data)
+            if magic != self.MAGIC or version != self.VERSION:
+                return None
+            pixels = zlib.decompress(data[self.HEADER.size:])
+        except (OSError, struct.error, zlib.error):
+            return None
+
+        # One surface built straight from the raw bytes, sliced into frames
+        strip = pygame.image.frombuffer(pixels, (width, height * count), "RGBA")
+        if pygame.display.get_surface() is not None:
+            strip = strip.convert_alpha()
+        else:
+            strip = strip.copy()  # Detach from the bytes buffer
+        return [strip.subsurface((0, i * height, width, height)) for i in range(count)]
+
+    def write(self, cache_path, frames, stale_pattern):
+        """Write frames to a cache file and delete stale entries for the same definition."""
+        width, height = frames[0].get_size()
+        strip = pygame.Surface((width, height * len(frames)), pygame.SRCALPHA)
+        strip.blits([(frame, (0, i * height)) for i, frame in enumerate(frames)], doreturn=False)
+        data = self.HEADER.pack(self.MAGIC, self.VERSION, len(frames), width, height)
+        data += zlib.compress(pygame.image.tobytes(strip, "RGBA"), 1)
+
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            for stale_path in glob.glob(os.path.join(self.cache_dir, stale_pattern)):
+                if stale_path != cache_path:
+                    os.remove(stale_path)
+            temp_path = cache_path + ".tmp"
+            with open(temp_path, "wb") as file:
+                file.write(data)
+            os.replace(temp_path, cache_path)
+        except OSError as e:
+            print(f"Error writing asset cache '{cache_path}': {e}")
+
+    def clear(self):
+        """Delete every cache file."""
+        for path in glob.glob(os.path.join(self.cache_dir, "*.bin")):
+            os.remove(path)
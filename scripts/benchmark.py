@@ -0,0 +1,281 @@
+"""
+    Program: Battlefront Blitz
+    Purpose: Headless rendering benchmarks for World, SpriteManager and the main loop.
+
+    Runs with the SDL dummy video driver, so no display is needed:
+        python scripts/benchmark.py --output bench.json
+    Per-call timings are reported in milliseconds as JSON percentiles so runs
+    can be compared for regressions.
+"""
+
+## Include libraries
+import argparse
+import json
+import os
+import platform
+import random
+import tempfile
+import time
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+os.environ.setdefault("PYGAME_HIDE_SUPPORT_PROMPT", "1")  # Keep stdout pure JSON
+
+import numpy as np
+import pygame
+
+from sprites import SpriteManager
+from asset_cache import AssetCache
+from spatial import SpatialHash
+from pathfinding import FlowField
+from world import World
+from config import Config
+from main import load_sprites, initialize_world
+
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+## Functions
+def summarize(times):
+    """Summarize a list of timings (seconds) as millisecond percentiles."""
+    ms = np.array(times) * 1000.0
+    return {
+        "count": len(ms),
+        "mean": round(float(ms.mean()), 4),
+        "p50": round(float(np.percentile(ms, 50)), 4),
+        "p95": round(float(np.percentile(ms, 95)), 4),
+        "p99": round(float(np.percentile(ms, 99)), 4),
+        "max": round(float(ms.max()), 4),
+    }
+
+def time_calls(func, count, warmup=0):
+    """Call func(i) warmup + count times and return the timings of the last count calls."""
+    for i in range(warmup):
+        func(i)
+    times = []
+    for i in range(count):
+        start = time.perf_counter()
+        func(i)
+        times.append(time.perf_counter() - start)
+    return times
+
+def bench_load_sprites(results, repeats):
+    """Time load_sprites startup from a fresh SpriteManager, with a cold and a warm asset cache."""
+    with tempfile.TemporaryDirectory() as cache_dir:
+        def cold(i):
+            asset_cache = AssetCache(cache_dir)
+            asset_cache.clear()
+            load_sprites(SpriteManager(), asset_cache)
+        times = time_calls(cold, repeats)
+        results.append({"name": "load_sprites", "params": {"cache": "cold"}, "ms": summarize(times)})
+
+        times = time_calls(lambda i: load_sprites(SpriteManager(), AssetCache(cache_dir)), repeats)
+        results.append({"name": "load_sprites", "params": {"cache": "warm"}, "ms": summarize(times)})
+
+def bench_sprite_lookups(results, sprite_manager, count):
+    """Time SpriteManager lookups, plain and scaled."""
+    sprite_ids = list(sprite_manager.sprites)
+    picks = [random.choice(sprite_ids) for _ in range(count)]
+
+    times = time_calls(lambda i: sprite_manager.get_sprite(picks[i]).get_image(), count)
+    results.append({"name": "sprite_lookup", "params": {}, "ms": summarize(times)})
+
+    for scale in (0.5, 0.8):
+        times = time_calls(lambda i: sprite_manager.get_scaled_image(picks[i], 0, scale), count)
+        results.append({"name": "sprite_lookup_scaled", "params": {"scale": scale}, "ms": summarize(times)})
+
+def bench_world(results, config, sprite_manager, size, viewports, scales, frames):
+    """Time World.render, World.render_map and a full play frame for one world size."""
+    world, tile_to_sprite = initialize_world(config, sprite_manager, size, size)
+    speed = 40  # Pixels panned per frame
+
+    for viewport in viewports:
+        screen = pygame.Surface(viewport)
+        world.viewport_width, world.viewport_height = viewport
+
+        for scale in scales:
+            world.set_scale(scale)
+            params = {"world": size, "viewport": list(viewport), "scale": scale}
+
+            world.set_view(0, 0)
+            times = time_calls(lambda i: world.render(screen, sprite_manager, tile_to_sprite, scale),
+                               frames, warmup=5)
+            results.append({"name": "world_render_static", "params": params, "ms": summarize(times)})
+
+            def pan(i):
+                world.move_view(speed, speed // 2)
+                world.render(screen, sprite_manager, tile_to_sprite, scale)
+            world.set_view(0, 0)
+            times = time_calls(pan, frames)
+            results.append({"name": "world_render_pan", "params": params, "ms": summarize(times)})
+
+        world.set_scale(1.0)
+
+        # Full play frame: scroll, world, mini-map and present
+        display = pygame.display.get_surface()
+        def frame(i):
+            world.move_view(speed, 0)
+            screen.fill((0, 0, 0))
+            world.render(screen, sprite_manager, tile_to_sprite, 1.0)
+            world.render_map(screen)
+            display.blit(screen, (0, 0))
+            pygame.display.flip()
+        world.set_view(0, 0)
+        times = time_calls(frame, frames, warmup=5)
+        results.append({"name": "play_frame", "params": {"world": size, "viewport": list(viewport)},
+                        "ms": summarize(times)})
+
+    screen = pygame.Surface(viewports[0])
+    times = time_calls(lambda i: world.render_map(screen), frames, warmup=1)
+    results.append({"name": "render_map", "params": {"world": size}, "ms": summarize(times)})
+
+    def edit_and_render(i):
+        row = i % (size - 4)
+        world.place_rectangle(204, (row, row), (row + 3, row + 3))
+        world.render_map(screen)
+    times = time_calls(edit_and_render, frames)
+    results.append({"name": "render_map_after_edit", "params": {"world": size}, "ms": summarize(times)})
+
+    start = time.perf_counter()
+    world.minimap_image = None
+    world.update_minimap()
+    results.append({"name": "render_map_rebuild", "params": {"world": size},
+                    "ms": summarize([time.perf_counter() - start])})
+
+def bench_spatial(results, counts, queries, tile_size=32):
+    """
+    Time SpatialHash inserts, moves and queries against a naive scan over every
+    entity. Entity density is kept constant, so per-query cost of the index
+    should stay flat as the count grows while the naive scan grows linearly.
+    """
+    rng = np.random.default_rng(0)
+    radius = 6 * tile_size  # Tower range
+
+    for count in counts:
+        side = np.sqrt(count) * 2 * tile_size  # Roughly one entity per 2x2 tiles
+        positions = rng.uniform(0, side, (count, 2))
+        points = rng.uniform(0, side, (queries, 2))
+        params = {"entities": count}
+
+        index = SpatialHash(4 * tile_size)
+        start = time.perf_counter()
+        ids = np.array([index.insert(x, y) for x, y in positions.tolist()])
+        results.append({"name": "spatial_insert_all", "params": params,
+                        "ms": summarize([time.perf_counter() - start])})
+
+        times = time_calls(lambda i: index.query_radius(points[i, 0], points[i, 1], radius), queries)
+        results.append({"name": "spatial_query_radius", "params": params, "ms": summarize(times)})
+
+        def naive(i):
+            dx = positions[:, 0] - points[i, 0]
+            dy = positions[:, 1] - points[i, 1]
+            return np.flatnonzero(dx * dx + dy * dy <= radius * radius)
+        times = time_calls(naive, queries)
+        results.append({"name": "naive_query_radius", "params": params, "ms": summarize(times)})
+
+        times = time_calls(lambda i: index.query_rect(points[i, 0], points[i, 1],
+                                                      points[i, 0] + 400, points[i, 1] + 300), queries)
+        results.append({"name": "spatial_query_rect", "params": params, "ms": summarize(times)})
+
+        times = time_calls(lambda i: index.query_radius_batch(points[:, 0], points[:, 1], radius), 20)
+        results.append({"name": "spatial_query_batch", "params": dict(params, queries=queries),
+                        "ms": summarize(times)})
+
+        def move_all(i):
+            positions[:] += rng.uniform(-4, 4, positions.shape)
+            index.move_many(ids, positions[:, 0], positions[:, 1])
+        times = time_calls(move_all, 20)
+        results.append({"name": "spatial_move_all", "params": params, "ms": summarize(times)})
+
+def bench_pathfinding(results, config, sizes, edits):
+    """Time a full FlowField compute and the incremental repair after small lake edits."""
+    for size in sizes:
+        world = World(size, size, 32, 800, 600)
+        world.load_tile_definitions(config.terrain, config.tiles)
+        world.fill(204)  # Open water
+        params = {"world": size}
+
+        start = time.perf_counter()
+        flow_field = FlowField(world, [(size // 2, size // 2)])
+        results.append({"name": "flow_field_compute", "params": params,
+                        "ms": summarize([time.perf_counter() - start])})
+
+        rng = np.random.default_rng(0)
+        corners = rng.integers(0, size - 8, (edits, 2))
+        def edit(i):
+            row, col = corners[i]
+            world.place_rectangle(100, (row, col), (row + 3, col + 7))  # Island blocks the water
+            flow_field.refresh()
+        times = time_calls(edit, edits)
+        results.append({"name": "flow_field_edit", "params": params, "ms": summarize(times)})
+
+        rows, cols = rng.integers(0, size, (2, 10000))
+        times = time_calls(lambda i: flow_field.get_directions(rows, cols), edits)
+        results.append({"name": "flow_field_lookup_10k", "params": params, "ms": summarize(times)})
+
+def main():
+    parser = argparse.ArgumentParser(description="Headless rendering benchmarks.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[128, 512, 2048],
+                        help="World sizes in tiles (square).")
+    parser.add_argument("--scales", type=float, nargs="+", default=[1.0, 0.5, 0.37])
+    parser.add_argument("--viewports", nargs="+", default=["800x600", "1920x1080"],
+                        help="Viewport sizes as WIDTHxHEIGHT.")
+    parser.add_argument("--frames", type=int, default=200, help="Timed frames per benchmark.")
+    parser.add_argument("--suites", nargs="+", choices=["render", "spatial", "pathfinding"],
+                        default=["render", "spatial", "pathfinding"])
+    parser.add_argument("--entities", type=int, nargs="+", default=[1000, 2500, 5000, 10000],
+                        help="Entity counts for the spatial index benchmarks.")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="Write the JSON report to this file instead of stdout.")
+    args = parser.parse_args()
+
+    viewports = [tuple(int(n) for n in v.lower().split("x")) for v in args.viewports]
+
+    # Assets and config.yaml are loaded relative to the repository root
+    os.chdir(ROOT_DIR)
+    random.seed(args.seed)
+    np.random.seed(args.seed)
+
+    pygame.init()
+    pygame.display.set_mode(viewports[0])
+    config = Config()
+    config.map_generation = dict(config.map_generation, seed=args.seed)  # Same maps every run
+    config.map_import = dict(config.map_import, image=None)  # Worlds of the requested sizes
+
+    results = []
+    if "render" in args.suites:
+        bench_load_sprites(results, repeats=10)
+        sprite_manager = load_sprites(SpriteManager())
+        bench_sprite_lookups(results, sprite_manager, count=args.frames * 10)
+        for size in args.sizes:
+            bench_world(results, config, sprite_manager, size, viewports, args.scales, args.frames)
+    if "spatial" in args.suites:
+        bench_spatial(results, args.entities, queries=args.frames)
+    if "pathfinding" in args.suites:
+        bench_pathfinding(results, config, args.sizes, edits=20)
+
+    report = {
+        "meta": {
+            "python": platform.python_version(),
+            "pygame": pygame.version.ver,
+            "numpy": np.__version__,
+            "platform": platform.platform(),
+            "video_driver": pygame.display.get_driver(),
+            "frames": args.frames,
+            "seed": args.seed,
+        },
+        "results": results,
+    }
+    pygame.quit()
+
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as file:
+            file.write(text)
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
@@ -14,8 +14,75 @@ class Config:
                 "game_dev_date": "November 2024",
                 "screen_width": 800,
                 "screen_height": 600,
+                "fullscreen": False,
                 "fps": 60,
-            }
+                "update_rate": 60,
+                "max_updates_per_frame": 5,
+                "startup_budget_ms": 500,
+                "dirty_flip_threshold": 0.5,
+            },
+            "terrain": {
+                "land": {"walkable": True, "buildable": True, "color": [194, 178, 128]},
+                "water": {"walkable": False, "buildable": False, "color": [173, 216, 230]},
+            },
+            "tiles": [
+                {"id": 100, "terrain": "land", "sprite": "ground1"},
+                {"id": 200, "terrain": "water", "sprite": "water_lt"},
+                {"id": 201, "terrain": "water", "sprite": "water_lm"},
+                {"id": 202, "terrain": "water", "sprite": "water_lb"},
+                {"id": 203, "terrain": "water", "sprite": "water_mt"},
+                {"id": 204, "terrain": "water", "sprite": "water_mm"},
+                {"id": 205, "terrain": "water", "sprite": "water_mb"},
+                {"id": 206, "terrain": "water", "sprite": "water_rt"},
+                {"id": 207, "terrain": "water", "sprite": "water_rm"},
+                {"id": 208, "terrain": "water", "sprite": "water_rb"},
+                {"id": 209, "terrain": "water", "sprite": "water_v"},
+                {"id": 210, "terrain": "water", "sprite": "water_h"},
+            ],
+            "layers": {
+                "overlay": {"dtype": "uint16", "static": True, "visible": True},
+                "buildable": {"dtype": "uint8", "static": False, "visible": False,
+                              "colors": {1: [0, 200, 0, 70], 2: [200, 0, 0, 70]}},
+                "fog": {"dtype": "uint8", "static": False, "visible": True,
+                        "colors": {1: [0, 0, 0, 140], 2: [0, 0, 0, 255]}},
+            },
+            "map_generation": {
+                "seed": None,  # None for a different map every run
+                "water_fraction": 0.3,
+                "feature_size": 24,
+                "smoothing_passes": 4,
+            },
+            "map_import": {
+                "image": None,  # Color-coded map image to load instead of generating a map
+                "pixels_per_tile": 1,
+                "palette": [
+                    {"color": [77, 109, 243], "tile": 204},  # Water, autotiled
+                    {"color": [242, 196, 125], "tile": 100},  # Land
+                    {"color": [255, 255, 251], "tile": 100},  # Blank canvas
+                ],
+            },
+            "save": {
+                "path": "saves/quicksave.sav",
+                "autosave_interval": 120,  # Seconds of play between autosaves, 0 to disable
+                "compress": False,  # Compressed saves are smaller but cannot be memory-mapped
+            },
+            "quality": {
+                "enabled": True,
+                "target_fps": None,  # None for game_info fps
+                "window": 60,
+                "downgrade_at": 1.1,
+                "upgrade_at": 0.6,
+                "levels": [  # Lowest quality first
+                    {"effects_limit": 256, "minimap_interval": 1.0, "zoom_smoothing": False,
+                     "render_resolution": 0.5},
+                    {"effects_limit": 1024, "minimap_interval": 0.5, "zoom_smoothing": False,
+                     "render_resolution": 0.75},
+                    {"effects_limit": 4096, "minimap_interval": 0.25, "zoom_smoothing": False,
+                     "render_resolution": 1.0},
+                    {"effects_limit": 4096, "minimap_interval": 0.0, "zoom_smoothing": True,
+                     "render_resolution": 1.0},
+                ],
+            },
         }
         self.config = self.load_config(config_file)
         self.initialize_class_variables()
@@ -61,7 +128,32 @@ class Config:
         self.game_dev_date = game_info.get("game_dev_date", self.default_values["game_info"]["game_dev_date"])
         self.screen_width = game_info.get("screen_width", self.default_values["game_info"]["screen_width"])
         self.screen_height = game_info.get("screen_height", self.default_values["game_info"]["screen_height"])
+        self.fullscreen = game_info.get("fullscreen", self.default_values["game_info"]["fullscreen"])
         self.fps = game_info.get("fps", self.default_values["game_info"]["fps"])
+        self.update_rate = game_info.get("update_rate", self.default_values["game_info"]["update_rate"])
+        self.max_updates_per_frame = game_info.get("max_updates_per_frame",
+                                                   self.default_values["game_info"]["max_updates_per_frame"])
+        self.startup_budget_ms = game_info.get("startup_budget_ms",
+                                               self.default_values["game_info"]["startup_budget_ms"])
+        self.dirty_flip_threshold = game_info.get("dirty_flip_threshold",
+                                                  self.default_values["game_info"]["dirty_flip_threshold"])
+
+        # Tile definition registry (see World.load_tile_definitions)
+        self.terrain = self.config.get("terrain", self.default_values["terrain"])
+        self.tiles = self.config.get("tiles", self.default_values["tiles"])
+
+        # Tile layers above terrain (see World.add_layer)
+        self.layers = self.config.get("layers", self.default_values["layers"])
+
+        # Procedural map settings (see mapgen.generate_tiles)
+        self.map_generation = self.config.get("map_generation", self.default_values["map_generation"])
+        self.map_import = self.config.get("map_import", self.default_values["map_import"])
+
+        # Saved game settings (see savegame.py)
+        self.save = self.config.get("save", self.default_values["save"])
+
+        # Quality levels stepped through by the quality governor (see quality.py)
+        self.quality = self.config.get("quality", self.default_values["quality"])
 
     def __repr__(self):
         """
@@ -74,6 +166,11 @@ class Config:
             f"game_dev_date='{self.game_dev_date}', "
             f"screen_width={self.screen_width}, "
             f"screen_height={self.screen_height}, "
-            f"fps={self.fps}"
+            f"fullscreen={self.fullscreen}, "
+            f"fps={self.fps}, "
+            f"update_rate={self.update_rate}, "
+            f"max_updates_per_frame={self.max_updates_per_frame}, "
+            f"startup_budget_ms={self.startup_budget_ms}, "
+            f"dirty_flip_threshold={self.dirty_flip_threshold}"
             f")"
         )
\ No newline at end of file
@@ -0,0 +1,74 @@
+import pygame
+
+class DirtyRects:
+    """
+    Tracks the screen rectangles changed during a frame so only those are sent
+    to the display. Renderers register what they redrew with add, and things
+    drawn over the scene every frame (HUD text, sprites, the mini-map) with
+    add_overlay, which only marks them dirty when they appear, move, change or
+    disappear. A frame where nothing changed is not presented at all.
+    """
+
+    def __init__(self, size, flip_threshold=0.5, max_rects=64):
+        """
+        Initialize the tracker.
+        :param size: (width, height) of the screen.
+        :param flip_threshold: Fraction of the screen above which the whole display
+                               is flipped instead of updating rectangles.
+        :param max_rects: Number of rectangles above which the display is flipped as well.
+        """
+        self.flip_threshold = flip_threshold
+        self.max_rects = max_rects
+        self.rects = []
+        self.overlays = set()  # (x, y, width, height, token) drawn this frame
+        self.previous_overlays = set()  # ... and in the previous frame
+        self.resize(size)
+
+    def resize(self, size):
+        """Set the screen size, e.g. after changing the display mode; the next frame is presented in full."""
+        self.screen_rect = pygame.Rect((0, 0), size)
+        self.invalidate()
+
+    def invalidate(self):
+        """Mark the whole screen as changed, e.g. after a state change."""
+        self.full = True
+
+    def add(self, rect):
+        """Mark a rectangle of the screen as changed this frame."""
+        rect = self.screen_rect.clip(rect)
+        if rect.width and rect.height:
+            self.rects.append(rect)
+
+    def add_overlay(self, rect, token=None):
+        """
+        Register something drawn over the scene this frame.
+        :param rect: Rectangle it covers.
+        :param token: Hashable description of what was drawn (text, sprite frame, ...);
+                      the rectangle is dirty when it differs from the previous frame.
+        """
+        self.overlays.add((rect[0], rect[1], rect[2], rect[3], token))
+
+    def present(self):
+        """
+        Send the changed rectangles to the display, flipping it when they cover
+        more than flip_threshold of the screen (or there are more than
+        max_rects of them), then start a new frame.
+        :return: True if the display was updated.
+        """
+        # Overlays that appeared, changed or disappeared since the last frame
+        for x, y, width, height, _ in self.overlays ^ self.previous_overlays:
+            self.add((x, y, width, height))
+        self.previous_overlays = self.overlays
+        self.overlays = set()
+
+        rects = self.rects
+        self.rects = []
+        if self.full or len(rects) > self.max_rects or sum(rect.width * rect.height for rect in rects) > \
+                self.flip_threshold * self.screen_rect.width * self.screen_rect.height:
+            self.full = False
+            pygame.display.flip()
+            return True
+        if rects:
+            pygame.display.update(rects)
+            return True
+        return False
@@ -0,0 +1,203 @@
+from collections import OrderedDict
+
+import numpy as np
+import pygame
+
+from sprites import rotate_to_step, rotation_step
+
+class EffectsSystem:
+    """
+    Animated effects (explosions, ...) kept as a struct of preallocated numpy
+    arrays, one slot per effect instance. All instances are advanced with one
+    vectorized step and drawn with one Surface.blits call. Expired slots go
+    back on a free-slot stack, so spawning allocates no Python objects.
+    """
+    STATE_ARRAYS = ("x", "y", "sprite", "start_time", "flip", "rotation", "frame")  # Saved per effect
+
+    def __init__(self, sprite_manager, capacity=4096, rotation_steps=64, max_cached_images=4096):
+        """
+        Initialize the effects system.
+        :param sprite_manager: SpriteManager holding the animated sprites.
+        :param capacity: Maximum number of simultaneous effects.
+        :param rotation_steps: Rotations are snapped to this many steps per turn.
+        :param max_cached_images: Maximum number of flipped/rotated images kept (LRU).
+        """
+        self.sprite_manager = sprite_manager
+        self.capacity = capacity
+        self.limit = capacity  # Active effects allowed, may be lowered by quality settings
+        self.rotation_steps = rotation_steps
+
+        # Instance arrays
+        self.x = np.zeros(capacity, dtype=np.float32)  # World position of the effect's center (pixels)
+        self.y = np.zeros(capacity, dtype=np.float32)
+        self.sprite = np.zeros(capacity, dtype=np.int16)  # Index into sprite_ids
+        self.start_time = np.zeros(capacity, dtype=np.float64)
+        self.flip = np.zeros(capacity, dtype=bool)
+        self.rotation = np.zeros(capacity, dtype=np.int16)  # Rotation step
+        self.frame = np.zeros(capacity, dtype=np.int32)  # Current frame, set by update
+        self.elapsed = np.zeros(capacity, dtype=np.float64)  # Scratch buffer for update
+        self.active = np.zeros(capacity, dtype=bool)
+        self.active_count = 0
+
+        # Stack of free slots; free[:free_count] are available
+        self.free = np.arange(capacity - 1, -1, -1, dtype=np.int32)
+        self.free_count = capacity
+
+        # Per-sprite tables, indexed by the sprite array
+        self.sprite_ids = []
+        self.frame_counts = np.zeros(0, dtype=np.int32)
+        self.frame_times = np.zeros(0, dtype=np.float64)
+
+        # Flipped/rotated frames: (sprite, frame, flip, rotation, scale bucket) -> Surface
+        self.max_cached_images = max_cached_images
+        self.images = OrderedDict()
+
+    def sprite_index(self, sprite_id):
+        """Return the index of an animated sprite in the per-sprite tables, registering it if new."""
+        if sprite_id in self.sprite_ids:
+            return self.sprite_ids.index(sprite_id)
+        sprite = self.sprite_manager.get_sprite(sprite_id)
+        self.sprite_ids.append(sprite_id)
+        self.frame_counts = np.append(self.frame_counts, sprite.get_frame_count())
+        self.frame_times = np.append(self.frame_times, sprite.frame_time or 0.1)
+        return len(self.sprite_ids) - 1
+
+    def spawn(self, sprite_id, x, y, now, flip=False, angle=0):
+        """
+        Start an effect.
+        :param sprite_id: ID of an animated sprite.
+        :param x: World x position of the effect's center (pixels).
+        :param y: World y position of the effect's center (pixels).
+        :param now: Current simulation time in seconds.
+        :param flip: Flip the effect horizontally.
+        :param angle: Rotation in degrees.
+        :return: The slot used, or -1 if the limit is reached.
+        """
+        if self.free_count == 0 or self.active_count >= self.limit:
+            return -1
+        self.free_count -= 1
+        slot = self.free[self.free_count]
+
+        self.x[slot] = x
+        self.y[slot] = y
+        self.sprite[slot] = self.sprite_index(sprite_id)
+        self.start_time[slot] = now
+        self.flip[slot] = flip
+        self.rotation[slot] = rotation_step(angle, self.rotation_steps)
+        self.frame[slot] = 0
+        self.active[slot] = True
+        self.active_count += 1
+        return slot
+
+    def update(self, now):
+        """
+        Advance every effect to the given simulation time in one vectorized step,
+        recycling the slots of finished effects.
+        """
+        if self.active_count == 0:
+            return
+        sprites = self.sprite
+        np.subtract(now, self.start_time, out=self.elapsed)
+        np.divide(self.elapsed, self.frame_times[sprites], out=self.elapsed)
+        self.frame[:] = self.elapsed  # Truncates to the frame index
+        expired = np.flatnonzero(self.active & (self.frame >= self.frame_counts[sprites]))
+        if len(expired):
+            self.active[expired] = False
+            self.free[self.free_count:self.free_count + len(expired)] = expired
+            self.free_count += len(expired)
+            self.active_count -= len(expired)
+
+    def clear(self):
+        """Remove every effect."""
+        self.active[:] = False
+        self.active_count = 0
+        self.free[:] = np.arange(self.capacity - 1, -1, -1, dtype=np.int32)
+        self.free_count = self.capacity
+
+    def get_state(self):
+        """
+        Return the active effects as compact arrays, e.g. for saving.
+        :return: ({array name: values per active effect}, sprite IDs the "sprite" array indexes).
+        """
+        slots = np.flatnonzero(self.active)
+        arrays = {name: getattr(self, name)[slots] for name in self.STATE_ARRAYS}
+        return arrays, list(self.sprite_ids)
+
+    def set_state(self, arrays, sprite_ids):
+        """Replace every effect with the ones returned by get_state."""
+        self.clear()
+        count = min(len(arrays["x"]), self.capacity)
+        for name in self.STATE_ARRAYS:
+            getattr(self, name)[:count] = arrays[name][:count]
+        if count:
+            # Sprite indices of the saved table may differ from this one
+            remap = np.array([self.sprite_index(sprite_id) for sprite_id in sprite_ids], dtype=np.int16)
+            self.sprite[:count] = remap[self.sprite[:count]]
+        self.active[:count] = True
+        self.active_count = count
+        self.free_count = self.capacity - count
+        self.free[:self.free_count] = np.arange(self.capacity - 1, count - 1, -1, dtype=np.int32)
+
+    def get_source(self, sprite, frame, flip, rotation, scale):
+        """Return (surface, area) to draw a frame of an effect, area None for a plain image."""
+        sprite_id = self.sprite_ids[sprite]
+        if not flip and rotation == 0:
+            return (self.sprite_manager.get_atlas_area(sprite_id, frame, scale)
+                    or (self.sprite_manager.get_scaled_image(sprite_id, frame, scale), None))
+
+        key = (sprite, frame, flip, rotation, self.sprite_manager.scale_bucket(scale))
+        image = self.images.get(key)
+        if image is None:
+            image = self.sprite_manager.get_scaled_image(sprite_id, frame, scale)
+            if flip:
+                image = pygame.transform.flip(image, True, False)
+            if rotation:
+                image = rotate_to_step(image, rotation, self.rotation_steps)
+            self.images[key] = image
+            while len(self.images) > self.max_cached_images:
+                self.images.popitem(last=False)
+        else:
+            self.images.move_to_end(key)
+        return image, None
+
+    def render(self, screen, view, scale=1.0, dirty=None):
+        """
+        Draw every visible effect with a single Surface.blits call.
+        :param screen: Pygame screen to render on.
+        :param view: (world_x, world_y) of the top-left corner of the screen, e.g. World.get_view().
+        :param scale: Scale factor for rendering.
+        :param dirty: DirtyRects to register the drawn effects with, if any.
+        """
+        if self.active_count == 0:
+            return
+        slots = np.flatnonzero(self.active)
+        screen_x = (self.x[slots] - view[0]) * scale
+        screen_y = (self.y[slots] - view[1]) * scale
+
+        # Cull effects whose center is more than a sprite away from the screen
+        margin = 128 * scale
+        visible = ((screen_x > -margin) & (screen_x < screen.get_width() + margin) &
+                   (screen_y > -margin) & (screen_y < screen.get_height() + margin))
+        slots = slots[visible]
+        if len(slots) == 0:
+            return
+
+        # Resolve each distinct (sprite, frame, flip, rotation) once per render
+        sources = {}
+        batch = []
+        keys = []
+        for slot_x, slot_y, key in zip(screen_x[visible].tolist(), screen_y[visible].tolist(),
+                                       zip(self.sprite[slots].tolist(), self.frame[slots].tolist(),
+                                           self.flip[slots].tolist(), self.rotation[slots].tolist())):
+            source = sources.get(key)
+            if source is None:
+                surface, area = self.get_source(*key, scale)
+                width, height = area.size if area is not None else surface.get_size()
+                source = sources[key] = (surface, area, width // 2, height // 2)
+            batch.append((source[0], (slot_x - source[2], slot_y - source[3]), source[1]))
+            keys.append(key)
+        if dirty is None:
+            screen.blits(batch, doreturn=False)
+        else:
+            for rect, key in zip(screen.blits(batch), keys):
+                dirty.add_overlay(rect, key)
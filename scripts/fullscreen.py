@@ -1,22 +1,37 @@
 import pygame
-import os
+
+def set_display_mode(size, fullscreen=False):
+    """
+    Open the display at a fixed logical resolution. With pygame.SCALED, SDL
+    scales every frame to the window or monitor in one pass (letterboxed to
+    keep the aspect ratio) and maps mouse positions back to logical
+    coordinates, so the game only ever sees the logical resolution.
+    :param size: (width, height) logical resolution.
+    :param fullscreen: Start in fullscreen instead of a window.
+    :return: The display Surface, always of the logical size.
+    """
+    screen = pygame.display.set_mode(size, pygame.SCALED)
+    if fullscreen:
+        screen = toggle_fullscreen(screen)
+    return screen
+
+def toggle_fullscreen(screen):
+    """
+    Switch a display opened with set_display_mode between windowed and fullscreen.
+    :return: The display Surface, which keeps the logical size.
+    """
+    try:
+        pygame.display.toggle_fullscreen()
+    except pygame.error as e:
+        print(f"Error toggling fullscreen: {e}")
+    return pygame.display.get_surface() or screen
 
 def main():
     pygame.init()
 
-    # Ensure the window starts at the top-left corner
-    os.environ["SDL_VIDEO_WINDOW_POS"] = "0,0"
-
-    # Default windowed resolution
+    # The game always renders at this resolution, whatever the window or monitor size
     screen_width, screen_height = 800, 600
-    fullscreen = False
-
-    # Detect current display resolution
-    display_info = pygame.display.Info()
-    fullscreen_width, fullscreen_height = display_info.current_w, display_info.current_h
-
-    # Start in windowed mode
-    screen = pygame.display.set_mode((screen_width, screen_height))
+    screen = set_display_mode((screen_width, screen_height))
     pygame.display.set_caption("Fullscreen Toggle Example")
     clock = pygame.time.Clock()
 
@@ -28,14 +43,7 @@ def main():
 
             if event.type == pygame.KEYDOWN:
                 if event.key == pygame.K_F11:  # Toggle fullscreen
-                    fullscreen = not fullscreen
-                    if fullscreen:
-                        os.environ["SDL_VIDEO_WINDOW_POS"] = "0,0"
-                        screen = pygame.display.set_mode(
-                            (fullscreen_width, fullscreen_height), pygame.NOFRAME
-                        )
-                    else:
-                        screen = pygame.display.set_mode((screen_width, screen_height))
+                    screen = toggle_fullscreen(screen)
                 elif event.key == pygame.K_ESCAPE:  # Quit with ESC
                     running = False
 
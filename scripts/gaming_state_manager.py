@@ -1,12 +1,19 @@
 import pygame
-import sys
+import os
+import yaml
 
 class GamingStateManager:
-    def __init__(self, scale=1.0):
-        self.current_state = "main_menu"
-        self.scale = scale
+    """
+    Table-driven game state machine compiled from game_state.yaml.
 
-        # Define base clickable regions (unscaled coordinates)
+    Transitions are looked up in a dictionary keyed by (state, event type, key),
+    so handling an event costs one lookup however many states there are.
+    Each state may register enter/exit/update/render/event handlers.
+    """
+    HANDLERS = ("enter", "exit", "update", "render", "event")
+
+    def __init__(self, state_file="game_state.yaml"):
+        # Clickable regions, in logical screen coordinates (the display scales them)
         self.regions = {
             "play": (350, 150, 450, 200),
             "setup": (350, 210, 450, 260),
@@ -14,86 +21,119 @@ class GamingStateManager:
             "exit": (350, 330, 450, 380),
         }
 
-        # Initialize scaled regions
-        # self.regions = self.scale_regions(scale)
+        # Compiled transition tables
+        self.dispatch = {}  # (state, event type, key) -> [(region or None, next state), ...]
+        self.auto = {}  # state -> next state, taken on the first update in the state
+        self.handlers = {}  # state -> {"enter": callable or None, ...}
+        self.current_state = self.load_transitions(state_file)
 
-        # Key mappings
-        self.keymap = {
-            "key_play": pygame.K_p,
-            "key_exit": pygame.K_x,
-            "key_quit": pygame.K_q,
-            "key_pause": pygame.K_SPACE,
-            "key_escape": pygame.K_ESCAPE,
-        }
+    def load_transitions(self, state_file):
+        """
+        Compile the transitions of a state file into the dispatch tables.
+        Triggers are a key name ("P", "ESCAPE"), "click:<region>", "auto" or
+        "<name>=True" for triggers fired by the game (see fire).
+        :return: The initial state.
+        """
+        if not os.path.exists(state_file):
+            print(f"State file '{state_file}' not found.")
+            return "main_menu"
+        with open(state_file, "r") as file:
+            data = yaml.safe_load(file) or {}
+
+        for transition in data.get("transitions", []):
+            state = transition["current_state"]
+            next_state = transition["next_state"]
+            trigger = str(transition["trigger"])
+            self.add_state(state)
+            self.add_state(next_state)
+
+            if trigger == "auto":
+                self.auto[state] = next_state
+            elif trigger.startswith("click:"):
+                key = (state, pygame.MOUSEBUTTONDOWN, 1)  # Left click
+                self.dispatch.setdefault(key, []).append((trigger[len("click:"):], next_state))
+            elif trigger.endswith("=True"):
+                key = (state, "trigger", trigger[:-len("=True")])
+                self.dispatch.setdefault(key, []).append((None, next_state))
+            else:
+                key = (state, pygame.KEYDOWN, pygame.key.key_code(trigger.lower()))
+                self.dispatch.setdefault(key, []).append((None, next_state))
+
+        initial_state = data.get("initial_state", "main_menu")
+        self.add_state(initial_state)
+        return initial_state
+
+    def add_state(self, state):
+        """Declare a state, with no handlers yet."""
+        self.handlers.setdefault(state, dict.fromkeys(self.HANDLERS))
+
+    def set_handlers(self, state, **handlers):
+        """
+        Register handlers for a state: enter(), exit(), update(dt), render(screen)
+        and event(event) for events that do not trigger a transition.
+        """
+        self.add_state(state)
+        for name, handler in handlers.items():
+            if name not in self.HANDLERS:
+                raise ValueError(f"Unknown state handler '{name}'")
+            self.handlers[state][name] = handler
 
-    # def scale_regions(self, scale=1.0):
-        # """Scale the clickable regions based on the provided scale factor."""
-        # scaled_regions = {}
-        # for name, (x1, y1, x2, y2) in self.regions.items():
-            # scaled_regions[name] = (
-                # int(x1 * scale),
-                # int(y1 * scale),
-                # int(x2 * scale),
-                # int(y2 * scale),
-            # )
-        # return scaled_regions
-
-    # def update_scale(self, new_scale):
-        # """Update the scale and recalculate regions."""
-        # self.scale = new_scale
-        # self.regions = self.scale_regions(new_scale)
+    def change_state(self, next_state):
+        """Leave the current state and enter another, calling their exit/enter handlers."""
+        exit_handler = self.handlers[self.current_state]["exit"]
+        if exit_handler:
+            exit_handler()
+        self.current_state = next_state
+        enter_handler = self.handlers[next_state]["enter"]
+        if enter_handler:
+            enter_handler()
 
     def handle_event(self, event, mouse_pos):
         """Process events and update the state accordingly."""
-        # Scale the mouse position to match the unscaled regions
-        mouse_x = int(mouse_pos[0]) # / self.scale)
-        mouse_y = int(mouse_pos[1])# / self.scale)
-
-        # Handle key inputs
         if event.type == pygame.KEYDOWN:
-            if self.current_state == "main_menu":
-                if event.key == self.keymap["key_play"]:
-                    self.current_state = "play"
-                elif event.key == self.keymap["key_exit"]:
-                    self.current_state = "exit_game"
-                    self.exit_game()
-            elif self.current_state == "play" and event.key == self.keymap["key_escape"]:
-                self.current_state = "main_menu"
-            elif self.current_state == "setup" and event.key == self.keymap["key_escape"]:
-                self.current_state = "main_menu"
-            elif self.current_state == "restore" and event.key == self.keymap["key_escape"]:
-                self.current_state = "main_menu"
-
-        # Handle mouse inputs
-        elif event.type == pygame.MOUSEBUTTONDOWN and event.button == 1:  # Left click
-            if self.current_state == "main_menu":
-                if self.is_in_region("play", mouse_x, mouse_y):
-                    self.current_state = "play"
-                    print("Transitioning to play state.")
-                elif self.is_in_region("setup", mouse_x, mouse_y):
-                    self.current_state = "setup"
-                    print("Transitioning to setup state.")
-                elif self.is_in_region("restore", mouse_x, mouse_y):
-                    self.current_state = "restore"
-                    print("Transitioning to restore state.")
-                elif self.is_in_region("exit", mouse_x, mouse_y):
-                    self.current_state = "exit_game"
-                    print("Exiting game.")
-                    self.exit_game()
+            key = event.key
+        elif event.type == pygame.MOUSEBUTTONDOWN:
+            key = event.button
+            mouse_pos = event.pos
+        else:
+            key = None
+
+        for region, next_state in self.dispatch.get((self.current_state, event.type, key), ()):
+            if region is None or self.is_in_region(region, int(mouse_pos[0]), int(mouse_pos[1])):
+                self.change_state(next_state)
+                return
+
+        event_handler = self.handlers[self.current_state]["event"]
+        if event_handler:
+            event_handler(event)
+
+    def fire(self, trigger):
+        """Fire a game trigger such as "win" or "loss" (the "win=True" triggers of the state file)."""
+        for _, next_state in self.dispatch.get((self.current_state, "trigger", trigger), ()):
+            self.change_state(next_state)
+            return
+
+    def update(self, dt):
+        """Run the current state's update handler, then take its auto transition if it has one."""
+        update_handler = self.handlers[self.current_state]["update"]
+        if update_handler:
+            update_handler(dt)
+        next_state = self.auto.get(self.current_state)
+        if next_state is not None:
+            self.change_state(next_state)
+
+    def render(self, screen):
+        """Run the current state's render handler."""
+        render_handler = self.handlers[self.current_state]["render"]
+        if render_handler:
+            render_handler(screen)
 
     def is_in_region(self, region_name, x, y):
         """Check if a point is within a defined region."""
         if region_name in self.regions:
             x1, y1, x2, y2 = self.regions[region_name]
-            print(x1, y1, x2, y2)
             return x1 <= x <= x2 and y1 <= y <= y2
         return False
 
-    def exit_game(self):
-        """Exit the game cleanly."""
-        print("Exiting game...")
-        pygame.quit()
-        sys.exit()
-
     def get_state(self):
         return self.current_state
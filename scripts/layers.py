@@ -0,0 +1,61 @@
+import numpy as np
+import pygame
+
+from tile_storage import TileStorage
+
+class TileLayer:
+    """
+    One named grid of per-tile values drawn over the layers below it.
+
+    Sprite layers hold tile IDs drawn with the world's tile sprites (IDs without
+    a sprite, such as 0, are left empty). Color layers hold small values mapped
+    to RGBA tints, e.g. build markers or fog. Static layers are composited into
+    the world's cached chunks; dynamic layers are drawn fresh every frame, so
+    changing them never invalidates the cache.
+    """
+
+    def __init__(self, name, height, width, dtype=np.uint16, static=True, visible=True, colors=None,
+                 chunk_size=64, path=None):
+        """
+        Initialize the layer.
+        :param name: Layer name, e.g. "terrain", "overlay", "buildable" or "fog".
+        :param height: Height of the layer in tiles.
+        :param width: Width of the layer in tiles.
+        :param dtype: Type of the stored values (numpy dtype or name such as "uint8").
+        :param static: Composite into the chunk cache (True) or draw every frame (False).
+        :param visible: Whether the layer is drawn.
+        :param colors: For color layers, a dictionary of value -> [r, g, b, a]; None for a sprite layer.
+        :param chunk_size: Width and height of a storage chunk.
+        :param path: .npy file to memory-map the values from, None to keep them in memory.
+        """
+        self.name = name
+        self.tiles = TileStorage(height, width, chunk_size, np.dtype(dtype), path)
+        self.static = static
+        self.visible = visible
+        self.colors = None
+        if colors is not None:
+            # RGBA per value; values without a color (and past the table) are transparent
+            self.colors = np.zeros((max(colors, default=0) + 2, 4), dtype=np.uint8)
+            for value, color in colors.items():
+                self.colors[int(value)] = color
+
+    def is_color_layer(self):
+        return self.colors is not None
+
+    def draw_colors(self, surface, block, dest, tile_size):
+        """
+        Draw a block of a color layer as tinted tiles with a single blit:
+        one pixel per tile, scaled up to the tile size.
+        :param surface: Surface to draw on.
+        :param block: 2D array of layer values.
+        :param dest: (x, y) position of the block's top-left tile on the surface.
+        :param tile_size: Size of a tile in pixels.
+        """
+        rgba = self.colors[np.minimum(block, len(self.colors) - 1)]
+        if not rgba[..., 3].any():
+            return  # Fully transparent, e.g. no fog or markers in view
+        height, width = block.shape
+        image = pygame.image.frombuffer(np.ascontiguousarray(rgba).tobytes(), (width, height), "RGBA")
+        if pygame.display.get_surface() is not None:
+            image = image.convert_alpha()  # Match the display's pixel format, or blending is far slower
+        surface.blit(pygame.transform.scale(image, (width * tile_size, height * tile_size)), dest)
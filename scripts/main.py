@@ -8,43 +8,51 @@
 import pygame
 import sys
 import numpy as np
-import random
 import yaml
 import os
+import time
 
 from gaming_state_manager import GamingStateManager
-from sprites import SpriteSheet, Sprite, SpriteManager
+from sprites import Sprite, SpriteManager
 from world import World
 from config import Config
+from profiler import FrameProfiler
+from asset_cache import AssetCache
+from effects import EffectsSystem
+from text_renderer import TextRenderer
+from dirty_rects import DirtyRects
+from fullscreen import set_display_mode, toggle_fullscreen
+from quality import QualityGovernor
+from savegame import BackgroundSaveWriter, find_latest_save, get_save_target, take_snapshot, restore_snapshot
+from mapgen import BackgroundMapGenerator, autotile_table, generate_tiles
+from map_import import load_map
 
 
 
 
 
 ## Functions    
-def draw_play(screen, sprite_manager):
+def draw_play(screen, sprite_manager, text):
     """Render the play state and explosions."""
-    font = pygame.font.Font(None, 36)
-    text_surface = font.render("State: play... Press ESC to quit playing.", True, (255, 255, 255))
-    screen.blit(text_surface, (200, 250))
+    text.draw(screen, "State: play... Press ESC to quit playing.", (200, 250))
     
     # Render explosions
     # sprite_manager.render(screen)
 
-def draw_setup(screen, sprite_manager):
+def draw_setup(screen, sprite_manager, text):
     """Render the play state and explosions."""
-    font = pygame.font.Font(None, 36)
-    text_surface = font.render("State: setup... Press ESC to exit setup.", True, (255, 255, 255))
-    screen.blit(text_surface, (200, 250))
+    screen.fill((0, 0, 0))  # Clear the screen
+    text.draw(screen, "State: setup... Press ESC to exit setup.", (200, 250))
     
     # Render explosions
     # sprite_manager.render(screen)
     
-def draw_restore(screen, sprite_manager):
-    """Render the play state and explosions."""
-    font = pygame.font.Font(None, 36)
-    text_surface = font.render("State: restore... Press ESC to exit restore.", True, (255, 255, 255))
-    screen.blit(text_surface, (200, 250))
+def draw_restore(screen, sprite_manager, text, message=None):
+    """Render the restore state, with a message when there is nothing to restore."""
+    screen.fill((0, 0, 0))  # Clear the screen
+    text.draw(screen, "State: restore... Press ESC to exit restore.", (200, 250))
+    if message:
+        text.draw(screen, message, (200, 300))
     
     # Render explosions
     # sprite_manager.render(screen)    
@@ -58,103 +66,102 @@ def draw_restore(screen, sprite_manager):
         # text_rect = text_surface.get_rect(center=((x1 + x2) // 2, (y1 + y2) // 2))
         # screen.blit(text_surface, text_rect)
 
-def draw_menu(screen, regions, scale=1):
-    """Render the main menu with interactive regions, dynamically centered and scaled."""
-    screen_width, screen_height = screen.get_size()  # Get current screen dimensions
-    font = pygame.font.Font(None, int(36 * scale))  # Scale font size
+def draw_menu(screen, regions, text):
+    """Render the main menu with interactive regions, centered on the logical screen."""
+    screen.fill((0, 0, 0))  # Clear the screen
+    screen_width, screen_height = screen.get_size()  # Logical screen dimensions
 
     for index, (name, (x1, y1, x2, y2)) in enumerate(regions.items()):
         # Calculate button dimensions
-        button_width = int((x2 - x1) * scale)
-        button_height = int((y2 - y1) * scale)
+        button_width = x2 - x1
+        button_height = y2 - y1
         
         # Calculate dynamic position to center the button
         center_x = screen_width // 2
         start_y = screen_height // 2 - (len(regions) * button_height) // 2  # Top of button stack
         center_y = start_y + index * (button_height + 10)  # Add spacing between buttons
 
-        # Calculate top-left corner of the scaled button
-        scaled_x1 = center_x - button_width 
-        scaled_y1 = center_y - button_height
+        # Calculate top-left corner of the button
+        button_x1 = center_x - button_width 
+        button_y1 = center_y - button_height
 
-        # Draw the scaled rectangle
+        # Draw the button
         pygame.draw.rect(
             screen, 
             (0, 128, 255), 
-            (scaled_x1 + button_width/2 , scaled_y1, button_width, button_height)
+            (button_x1 + button_width/2 , button_y1, button_width, button_height)
         )
 
         # Render the text and center it in the button
-        text_surface = font.render(name, True, (255, 255, 255))
-        text_rect = text_surface.get_rect(center=(center_x, center_y - button_height/2))
-        screen.blit(text_surface, text_rect)
-
-def load_sprites(sprite_manager):
-    """Load all the sprites and animations into the SpriteManager."""
-    sprite_sheet1 = SpriteSheet("assets/sprites/water-tiles.png")
-    sprite_manager.add_sprite("ground1", sprite_sheet1.sprite_sheet, 0, 0, 32, 32)
-    sprite_manager.add_sprite("water_lt", sprite_sheet1.sprite_sheet, 256, 32, 32, 32)
-    sprite_manager.add_sprite("water_lm", sprite_sheet1.sprite_sheet, 224, 320, 32, 32)
-    sprite_manager.add_sprite("water_lb", sprite_sheet1.sprite_sheet, 224, 96, 32, 32)
-    sprite_manager.add_sprite("water_mt", sprite_sheet1.sprite_sheet, 288, 32, 32, 32)
-    sprite_manager.add_sprite("water_mm", sprite_sheet1.sprite_sheet, 288, 64, 32, 32)
-    sprite_manager.add_sprite("water_mb", sprite_sheet1.sprite_sheet, 256, 416, 32, 32)
-    sprite_manager.add_sprite("water_rt", sprite_sheet1.sprite_sheet, 320, 32, 32, 32)
-    sprite_manager.add_sprite("water_rm", sprite_sheet1.sprite_sheet, 544, 378, 32, 32)
-    sprite_manager.add_sprite("water_rb", sprite_sheet1.sprite_sheet, 352, 96, 32, 32)
-    sprite_manager.add_sprite("water_v", sprite_sheet1.sprite_sheet, 480, 160, 32, 32)
-    sprite_manager.add_sprite("water_h", sprite_sheet1.sprite_sheet, 512, 224, 32, 32)
-
-    explosion = SpriteSheet("assets/sprites/effects.png")
-    sprite_manager.add_animation("explosion1", explosion.sprite_sheet, 0, 0, 63, 64, scale=1.0,
-                                  sprites_per_row=12, rows=4, frame_time=0.1)
+        text.draw(screen, name, (center_x, center_y - button_height/2), 36, center=True)
+
+def load_sprites(sprite_manager, asset_cache=None, manifest_path="assets/sprites/manifest.yaml"):
+    """
+    Declare the sprites of the manifest in the SpriteManager and load the terrain group.
+    Other groups are loaded on first use. Frames come from the on-disk AssetCache,
+    so source images are only decoded when they (or the sprite definitions) change.
+    """
+    if asset_cache is None:
+        asset_cache = AssetCache(sheets=sprite_manager.sheets)
+    sprite_manager.load_manifest(manifest_path, asset_cache)
+    sprite_manager.load_group("terrain")
+
+    # Pre-build the zoom-level pyramid so zooming never scales sprites per frame,
+    # and pack it into texture atlases for batched rendering
+    sprite_manager.build_zoom_levels()
+    sprite_manager.build_atlas()
     return sprite_manager
 
-def initialize_world(config, sprite_manager):
-    """Initialize the world with tiles and lakes."""
-    world = World(width_in_tiles=128, height_in_tiles=128, tile_size=32,
+def map_generation_args(config, world):
+    """
+    Return (args, kwargs) of mapgen.generate_tiles for the world, from the
+    map_generation section of config.yaml. Records the seed on the world.
+    """
+    options = dict(config.map_generation)
+    seed = options.pop("seed", None)
+    if seed is None:
+        seed = np.random.SeedSequence().entropy  # A new map every run, reproducible from world.seed
+    world.seed = seed
+    table, land_tile = autotile_table(world.tile_to_sprite)
+    return (world.width_in_tiles, world.height_in_tiles, seed, table, land_tile), options
+
+def initialize_world(config, sprite_manager, width_in_tiles=128, height_in_tiles=128, generate=True):
+    """
+    Initialize the world, its layers and its terrain. When config.yaml names a
+    map image, the world takes the image's size and terrain.
+    :param generate: Generate the terrain now; pass False to fill it with land and
+                     generate it in the background (see BackgroundMapGenerator).
+    """
+    tiles = None
+    if config.map_import.get("image"):
+        tile_to_sprite = {tile["id"]: tile["sprite"] for tile in config.tiles if tile.get("sprite")}
+        table, land_tile = autotile_table(tile_to_sprite)
+        tiles = load_map(config.map_import["image"], config.map_import["palette"], table, land_tile,
+                         config.map_import.get("pixels_per_tile", 1))
+        height_in_tiles, width_in_tiles = tiles.shape
+
+    world = World(width_in_tiles=width_in_tiles, height_in_tiles=height_in_tiles, tile_size=32,
                   win_width=config.screen_width, win_height=config.screen_height)
 
-    tile_to_sprite = {
-        100: "ground1",
-        200: "water_lt",
-        201: "water_lm",
-        202: "water_lb",
-        203: "water_mt",
-        204: "water_mm",
-        205: "water_mb",
-        206: "water_rt",
-        207: "water_rm",
-        208: "water_rb",
-        209: "water_v",
-        210: "water_h"
-    }
-
-    # Define tile IDs for the lake
-    lake_tile_ids = {
-        "lt": 200, "rt": 206, "lb": 202, "rb": 208,
-        "mt": 203, "mb": 205, "lm": 201, "rm": 207, "mm": 204
-    }
+    # Compile the tile definitions from config.yaml into lookup tables
+    world.load_tile_definitions(config.terrain, config.tiles)
+    tile_to_sprite = world.tile_to_sprite
+
+    # Layers drawn above the terrain (decorations, build markers, fog)
+    for name, options in config.layers.items():
+        world.add_layer(name, **options)
 
     world.set_view(1648, 3396)  # Initial view position
     
     # Fill the world with ground tiles
     world.fill(tile_id=100)
 
-    # Populate with lakes
-    for _ in range(2):
-        width = random.randint(13, 58)
-        height = random.randint(15, 34)
-        max_row = world.height_in_tiles - height
-        max_col = world.width_in_tiles - width
-        top_left_row = random.randint(0, max_row)
-        top_left_col = random.randint(0, max_col)
-        bottom_right_row = top_left_row + height - 1
-        bottom_right_col = top_left_col + width - 1
-
-        world.place_lake(top_left=(top_left_row, top_left_col),
-                         bottom_right=(bottom_right_row, bottom_right_col),
-                         tile_ids=lake_tile_ids)
+    # Imported or generated lakes and coastlines
+    if tiles is not None:
+        world.load_tiles(tiles)
+    elif generate:
+        args, options = map_generation_args(config, world)
+        world.load_tiles(generate_tiles(*args, **options), seed=world.seed)
 
     return world, tile_to_sprite
 
@@ -163,141 +170,298 @@ def initialize_world(config, sprite_manager):
 def main():
 
     ## Variables
-    scale = 1.0
+    scale = 1.0  # Zoom factor the map is drawn at, see World.snap_scale
+    zoom = 1.0  # Zoom factor the mouse wheel steers, before snapping
+    zoom_step = 1.1  # Scale change per mouse wheel notch
     move_speed = 1200  # Speed of movement in pixels per second
 
     ## Initializaton
     config = Config() ## Read config file
     pygame.init()     ## Initialize pygame
-    screen = pygame.display.set_mode((config.screen_width, config.screen_height)) 
+    ## The game renders at the logical resolution of config.yaml; the display scales
+    ## it to the window or monitor once per frame and maps the mouse back (F11 toggles fullscreen)
+    screen = set_display_mode((config.screen_width, config.screen_height), config.fullscreen)
     clock = pygame.time.Clock()
+    text = TextRenderer()  # Cached fonts and rendered strings for menus and the HUD
+    caption = None  # Window caption currently set
+    dirty = DirtyRects(screen.get_size(), config.dirty_flip_threshold)  # Screen areas to present this frame
+    presented_state = None  # State shown by the last presented frame
     
-    state_manager = GamingStateManager(scale=scale) # Initialize the state manager
+    state_manager = GamingStateManager() # Initialize the state manager
 
     # Load sprites ans sprite_manager
+    load_start = time.perf_counter()
     sprite_manager = SpriteManager()
     sprite_manager = load_sprites(sprite_manager)
 
-    ## Initialize the world
-    world, tile_to_sprite = initialize_world(config, sprite_manager)
+    ## Initialize the world; its map is generated in a worker process while the menu shows
+    world, tile_to_sprite = initialize_world(config, sprite_manager, generate=False)
+    map_generator = BackgroundMapGenerator()
+    if not config.map_import.get("image"):
+        args, options = map_generation_args(config, world)
+        map_generator.start(*args, **options)
+
+    ## Animated effects (explosions)
+    effects = EffectsSystem(sprite_manager)
+
+    ## Quality governor: steps through the quality levels of config.yaml to hold the frame rate
+    quality = config.quality
+    governor = QualityGovernor(quality["levels"], quality.get("target_fps") or config.fps or 60,
+                               quality.get("window", 60), quality.get("downgrade_at", 1.1),
+                               quality.get("upgrade_at", 0.6))
+
+    def apply_quality(knobs):
+        """Set the quality knobs of the effects and world."""
+        effects.limit = min(effects.capacity, knobs.get("effects_limit", effects.capacity))
+        world.minimap_refresh_interval = knobs.get("minimap_interval", 0.0)
+        world.zoom_smoothing = knobs.get("zoom_smoothing", False)
+        world.render_resolution = knobs.get("render_resolution", 1.0)
+        dirty.invalidate()
+
+    apply_quality(governor.knobs)
+
+    ## Saved games (F5 saves while playing, restore loads the save)
+    saver = BackgroundSaveWriter()
+    last_save_time = 0.0  # Simulation time of the last save
+    restore_message = None
+    restored = False
+
+    # Keep cold start within budget
+    load_ms = (time.perf_counter() - load_start) * 1000
+    if load_ms > config.startup_budget_ms:
+        print(f"Startup took {load_ms:.0f} ms, over the {config.startup_budget_ms} ms budget.")
+
+    ## Frame profiler (F3 toggles the overlay, F4 dumps the buffer to CSV)
+    profiler = FrameProfiler(["frame", "events", "state", "update", "world", "effects", "minimap", "hud", "flip"])
+
+    ## Fixed-timestep simulation: real time is accumulated and consumed in
+    ## update_time steps, and rendering interpolates between the last two updates
+    update_time = 1.0 / config.update_rate
+    accumulator = 0.0
+    sim_time = 0.0  # Simulation clock in seconds, advanced only by play updates
+    alpha = 1.0
+    keys = pygame.key.get_pressed()
+    running = True
+
+
+    ## State handlers (transitions come from game_state.yaml)
+    def enter_load_level():
+        """Take the generated map, waiting for the worker if it is not done yet."""
+        if map_generator.is_pending():
+            world.load_tiles(map_generator.result(), seed=world.seed)
+
+    def update_play(dt):
+        nonlocal sim_time
+        world.begin_update()
+
+        # Handle world scrolling
+        delta_x = delta_y = 0
+        if keys[pygame.K_w]:  # Move up
+            delta_y -= move_speed * dt
+        if keys[pygame.K_s]:  # Move down
+            delta_y += move_speed * dt
+        if keys[pygame.K_a]:  # Move left
+            delta_x -= move_speed * dt
+        if keys[pygame.K_d]:  # Move right
+            delta_x += move_speed * dt
+        world.move_view(delta_x, delta_y)
+
+        # Advance explosions
+        sim_time += dt
+        effects.update(sim_time)
+
+        # Autosave
+        interval = config.save.get("autosave_interval")
+        if interval and sim_time - last_save_time >= interval:
+            save_game()
+
+    def save_game():
+        """Snapshot the game and write it on a background thread, skipping if a save is still being written."""
+        nonlocal last_save_time
+        if saver.is_pending():
+            return
+        path = get_save_target(world, config.save["path"])  # Never the file a restored world maps
+        snapshot = take_snapshot(world, effects, {"sim_time": sim_time})
+        saver.start(path, snapshot, config.save.get("compress", False))
+        last_save_time = sim_time
+
+    def enter_restore():
+        """Load the saved game into the world, then continue playing it (see update_restore)."""
+        nonlocal sim_time, last_save_time, scale, zoom, restore_message, restored
+        saver.wait()
+        path = find_latest_save(config.save["path"])
+        if path is None:
+            restore_message = "No saved game."
+            return
+        if map_generator.is_pending():
+            map_generator.result()  # Discard the generated map, the saved one replaces it
+        try:
+            state = restore_snapshot(path, world, effects)
+        except (OSError, ValueError, KeyError) as e:
+            print(f"Error restoring saved game: {e}")
+            restore_message = "The saved game could not be loaded."
+            return
+        sim_time = last_save_time = state.get("sim_time", 0.0)
+        scale = zoom = world.scale
+        restore_message = None
+        restored = True
+
+    def update_restore(dt):
+        nonlocal restored
+        if restored:
+            restored = False
+            state_manager.fire("restored")
+
+    def handle_play_event(event):
+        nonlocal scale, zoom
+        # Trigger explosions
+        if event.type == pygame.MOUSEBUTTONDOWN and event.button == 1:  # Left mouse click
+            mouse_x, mouse_y = event.pos
+            flip = mouse_x % 2 == 0  # Flip horizontally for every other explosion
+            effects.spawn("explosion1", world.world_x + mouse_x / scale, world.world_y + mouse_y / scale,
+                          sim_time, flip=flip)
+
+        # Zoom around the mouse cursor with the mouse wheel
+        elif event.type == pygame.MOUSEWHEEL:
+            zoom *= zoom_step ** event.y
+            zoom = max(sprite_manager.zoom_levels[0], min(zoom, sprite_manager.zoom_levels[-1]))
+            scale = world.snap_scale(zoom)  # Pick, spawn and render at the scale the map is drawn at
+            world.set_scale(scale, anchor=pygame.mouse.get_pos())
+
+        # Quick save
+        elif event.type == pygame.KEYDOWN and event.key == pygame.K_F5:
+            save_game()
+
+    def render_play(screen):
+        with profiler.section("world"):
+            world.render(screen, sprite_manager, tile_to_sprite, scale, alpha, dirty)  # Render the world and active sprites
+
+        with profiler.section("effects"):
+            effects.render(screen, world.get_view(alpha), scale, dirty)  # Render any active animations
+
+        # Display the type of the tile under the mouse cursor
+        with profiler.section("hud"):
+            mouse_x, mouse_y = pygame.mouse.get_pos()
+            tile_x = int((world.world_x + mouse_x / scale) // world.tile_size)
+            tile_y = int((world.world_y + mouse_y / scale) // world.tile_size)
+            if world.in_bounds(tile_y, tile_x):
+                tile_type = world.get_terrain(tile_y, tile_x).capitalize()
+            else:
+                tile_type = "Out of Bounds"
+            rect = text.draw(screen, f"Tile: {tile_type}", (10, 10))  # Render at the top-left corner
+            dirty.add_overlay(rect, tile_type)
+
+        # Render the mini-map if it's toggled on
+        if world.show_minimap:
+            with profiler.section("minimap"):
+                world.render_map(screen, dirty)
+
+    def enter_exit_game():
+        nonlocal running
+        running = False  # Exit the loop
+
+    state_manager.set_handlers("main_menu",
+                               render=lambda screen: draw_menu(screen, state_manager.regions, text))
+    state_manager.set_handlers("load_level", enter=enter_load_level)
+    state_manager.set_handlers("play", update=update_play, render=render_play, event=handle_play_event)
+    state_manager.set_handlers("setup", render=lambda screen: draw_setup(screen, sprite_manager, text))
+    state_manager.set_handlers("restore", enter=enter_restore, update=update_restore,
+                               render=lambda screen: draw_restore(screen, sprite_manager, text, restore_message))
+    state_manager.set_handlers("exit_game", enter=enter_exit_game)
 
 
     ## Loop when running
-    running = True
     while running:
     
         ## Update per loop
         mouse_pos = pygame.mouse.get_pos()
-        delta_time = clock.tick(config.fps) / 1000.0  # Time in seconds
-
-        ## Update window caption with mouse positions
-        caption = f"{config.game_title}  v{config.game_version} Date: {config.game_dev_date} "
-        caption += f"[{int(world.world_x)},{int(world.world_y)}] "
-        caption += f"({mouse_pos[0]},{mouse_pos[1]})"
-        pygame.display.set_caption(caption)
+        frame_time = clock.tick(config.fps) / 1000.0  # Time in seconds
+        frame_start = time.perf_counter()  # Work time excludes the frame rate cap
+        accumulator += frame_time
+        profiler.begin_frame()
+        profiler.start("frame")
+
+        ## Update window caption with mouse positions, only when it changes
+        new_caption = f"{config.game_title}  v{config.game_version} Date: {config.game_dev_date} "
+        new_caption += f"[{int(world.world_x)},{int(world.world_y)}] "
+        new_caption += f"({mouse_pos[0]},{mouse_pos[1]})"
+        if new_caption != caption:
+            caption = new_caption
+            pygame.display.set_caption(caption)
 
         ## Handle events
+        profiler.start("events")
         keys = pygame.key.get_pressed()  # Fetch the state of all keys once per frame
         for event in pygame.event.get():
             if event.type == pygame.QUIT:
                 running = False
+            elif event.type == pygame.WINDOWEXPOSED:
+                dirty.invalidate()  # The window contents were lost
 
             # State-independent key events
             if event.type == pygame.KEYDOWN:
                 if event.key == pygame.K_m:  # Toggle mini-map visibility
                     world.toggle_minimap()
-                    
-                # if event.key == pygame.K_F11:  # Toggle fullscreen
-                    # fullscreen = not fullscreen
-                    # if fullscreen:
-                        # os.environ["SDL_VIDEO_WINDOW_POS"] = "0,0"
-                        # screen = pygame.display.set_mode(
-                            # (fullscreen_width, fullscreen_height), pygame.NOFRAME
-                        # )
-                        # scale = fullscreen_width / config.screen_width  # Calculate scale factor
-                        # state_manager.update_scale(scale)  # Update regions with the new scale
-                    # else:
-                        # screen = pygame.display.set_mode((config.screen_width, config.screen_height))
-                        # state_manager.update_scale(1.0)  # Reset regions to 1:1 scale
-     
-
-            # Handle state-specific events
+                    dirty.invalidate()
+                elif event.key == pygame.K_F3:  # Toggle profiler overlay
+                    profiler.toggle_overlay()
+                    dirty.invalidate()
+                elif event.key == pygame.K_F4:  # Dump profiler buffer to CSV
+                    profiler.dump_csv()
+                elif event.key == pygame.K_F11:  # Toggle fullscreen, keeping the logical resolution
+                    screen = toggle_fullscreen(screen)
+                    dirty.invalidate()
+
+            # Handle state transitions and state-specific events
+            profiler.start("state")
             state_manager.handle_event(event, mouse_pos)
-
-            # Trigger explosions in the play state
-            if (
-                event.type == pygame.MOUSEBUTTONDOWN
-                and event.button == 1  # Left mouse click
-                and state_manager.get_state() == "play"
-            ):
-                mouse_x, mouse_y = event.pos
-                flip = mouse_x % 2 == 0  # Flip horizontally for every other explosion
-                pass
-
-
-
-        ## Handle state-specific updates
-        if state_manager.get_state() == "play":
-            # Handle world scrolling
-            delta_x = delta_y = 0
-            if keys[pygame.K_w]:  # Move up
-                delta_y -= move_speed * delta_time
-            if keys[pygame.K_s]:  # Move down
-                delta_y += move_speed * delta_time
-            if keys[pygame.K_a]:  # Move left
-                delta_x -= move_speed * delta_time
-            if keys[pygame.K_d]:  # Move right
-                delta_x += move_speed * delta_time
-            world.move_view(delta_x, delta_y)
-
-            # Determine the tile under the mouse cursor
-            tile_x = int((world.world_x + mouse_pos[0]) // world.tile_size)
-            tile_y = int((world.world_y + mouse_pos[1]) // world.tile_size)
-
-            if 0 <= tile_x < world.width_in_tiles and 0 <= tile_y < world.height_in_tiles:
-                tile_id = world.tiles[tile_y, tile_x]
-                if 100 <= tile_id < 200:
-                    tile_type = "Land"
-                elif 200 <= tile_id < 300:
-                    tile_type = "Water"
-                else:
-                    tile_type = "Unknown"
-            else:
-                tile_type = "Out of Bounds"
-            
-
-        ## Render based on state
-        screen.fill((0, 0, 0))  # Clear the screen
-        current_state = state_manager.get_state()
-
-        if current_state == "main_menu":
-            draw_menu(screen, state_manager.regions, scale=1)  # Render main menu
-        elif current_state == "play":
-        
-            world.render(screen, sprite_manager, tile_to_sprite, scale)  # Render the world and active sprites
-            
-            # Display the tile type
-            font = pygame.font.Font(None, 36)
-            text_surface = font.render(f"Tile: {tile_type}", True, (255, 255, 255))
-            screen.blit(text_surface, (10, 10))  # Render at the top-left corner            
-            
+            profiler.stop("state")
+        profiler.stop("events")
+
+
+
+        ## Take the generated map as soon as it is ready
+        if map_generator.is_ready():
+            world.load_tiles(map_generator.result(), seed=world.seed)
+
+        ## Handle state-specific updates at the fixed update rate
+        profiler.start("update")
+        updates = 0
+        while accumulator >= update_time:
+            if updates == config.max_updates_per_frame:
+                accumulator = 0.0  # Too far behind, drop the remaining time
+                break
+            state_manager.update(update_time)
+            accumulator -= update_time
+            updates += 1
+        alpha = accumulator / update_time  # Fraction of an update to interpolate
+        profiler.stop("update")
             
-            # Render the mini-map if it's toggled on
-            if world.show_minimap:
-                world.render_map(screen)
-        
-            # sprite_manager.render(screen)  # Render any active animations
-        elif current_state == "setup":
-            draw_setup(screen, sprite_manager)  # Render setup state
-        elif current_state == "restore":
-            draw_restore(screen, sprite_manager)  # Render restore state
-        elif current_state == "exit_game":
-            running = False  # Exit the loop
-
-        pygame.display.flip()  # Update the display 
-
-        clock.tick(config.fps)
 
+        ## Render based on state. Each state clears what it draws over; play
+        ## covers the whole screen with the world's back buffer
+        state_changed = state_manager.get_state() != presented_state
+        if state_changed:
+            presented_state = state_manager.get_state()
+            governor.reset()  # Loading and state changes are not steady frames
+            dirty.invalidate()
+        state_manager.render(screen)
+
+        if profiler.show_overlay:
+            dirty.add(profiler.render(screen))
+
+        ## Present only what changed; a static menu or an idle view is not presented at all
+        with profiler.section("flip"):
+            dirty.present()
+
+        ## Adapt quality to the time the play frames take
+        if quality.get("enabled", True) and presented_state == "play" and not state_changed:
+            if governor.record(time.perf_counter() - frame_start):
+                apply_quality(governor.knobs)
+        profiler.stop("frame")
+        profiler.end_frame()
+
+    saver.wait()  # Finish writing the last save
     pygame.quit()
 
 
@@ -0,0 +1,82 @@
+import hashlib
+import os
+
+import numpy as np
+import pygame
+
+from mapgen import land_sides, remove_spurs
+
+QUANTIZE_BITS = 5  # Colors are classified on a 32x32x32 grid, so anti-aliased pixels still match
+
+def palette_lookup(palette):
+    """
+    Build a lookup table from quantized RGB to tile ID, mapping every color to
+    the nearest palette entry.
+    :param palette: List of {"color": [r, g, b], "tile": tile_id} entries.
+    """
+    colors = np.array([entry["color"] for entry in palette], dtype=np.float32)
+    tiles = np.array([entry["tile"] for entry in palette], dtype=np.uint16)
+    levels = 1 << QUANTIZE_BITS
+    step = 256 // levels
+    centers = np.arange(levels, dtype=np.float32) * step + step / 2
+    grid = np.stack(np.meshgrid(centers, centers, centers, indexing="ij"), axis=-1).reshape(-1, 3)
+    distance = ((grid[:, None, :] - colors[None, :, :]) ** 2).sum(axis=2)
+    return tiles[distance.argmin(axis=1)]
+
+def image_to_tiles(image_path, palette, table, land_tile, pixels_per_tile=1):
+    """
+    Convert a color-coded map image into tile IDs in one vectorized pass, then
+    autotile the water so coastlines get edge and corner sprites.
+    :param image_path: Path of the map image.
+    :param palette: List of {"color": [r, g, b], "tile": tile_id} entries.
+    :param table: Water tile IDs indexed by land bitmask, from mapgen.autotile_table.
+                  Pixels classified as any of these tiles are treated as water.
+    :param land_tile: Tile ID for water tiles that have to be turned into land.
+    :param pixels_per_tile: Side of the square of pixels averaged into one tile.
+    :return: 2D uint16 array of tile IDs.
+    """
+    image = pygame.image.load(image_path)
+    pixels = pygame.surfarray.array3d(image).transpose(1, 0, 2)  # (height, width, rgb)
+    if pixels_per_tile > 1:
+        height = pixels.shape[0] // pixels_per_tile
+        width = pixels.shape[1] // pixels_per_tile
+        pixels = pixels[:height * pixels_per_tile, :width * pixels_per_tile]
+        pixels = pixels.reshape(height, pixels_per_tile, width, pixels_per_tile, 3).mean(axis=(1, 3))
+    pixels = pixels.astype(np.uint16) >> (8 - QUANTIZE_BITS)
+    tiles = palette_lookup(palette)[(pixels[..., 0] << (2 * QUANTIZE_BITS)) |
+                                    (pixels[..., 1] << QUANTIZE_BITS) | pixels[..., 2]]
+
+    classified = np.isin(tiles, table)
+    water = remove_spurs(classified)
+    tiles[classified & ~water] = land_tile  # Water spurs without a matching sprite become land
+    return np.where(water, table[land_sides(water)], tiles).astype(np.uint16)
+
+def load_map(image_path, palette, table, land_tile, pixels_per_tile=1, use_cache=True):
+    """
+    Load a map image as tile IDs, from a binary cache next to the image when
+    it is up to date. The cache (<image>.npz) is rebuilt when the image is
+    newer than it or the palette or tile settings changed.
+    Takes the arguments of image_to_tiles.
+    :return: 2D uint16 array of tile IDs.
+    """
+    cache_path = os.path.splitext(image_path)[0] + ".npz"
+    settings = repr(([(tuple(entry["color"]), entry["tile"]) for entry in palette],
+                     np.asarray(table).tolist(), land_tile, pixels_per_tile, QUANTIZE_BITS))
+    key = hashlib.sha1(settings.encode()).hexdigest()
+
+    if use_cache and os.path.exists(cache_path) and \
+            os.path.getmtime(cache_path) >= os.path.getmtime(image_path):
+        try:
+            with np.load(cache_path) as cached:
+                if str(cached["key"]) == key:
+                    return cached["tiles"]
+        except (OSError, KeyError, ValueError) as e:
+            print(f"Error reading map cache '{cache_path}': {e}")
+
+    tiles = image_to_tiles(image_path, palette, table, land_tile, pixels_per_tile)
+    if use_cache:
+        try:
+            np.savez(cache_path, tiles=tiles, key=np.array(key))
+        except OSError as e:
+            print(f"Error writing map cache '{cache_path}': {e}")
+    return tiles
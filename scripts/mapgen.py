@@ -0,0 +1,192 @@
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+# Water sprite for each combination of land on the four sides of a water tile,
+# indexed by a bitmask of N=1, E=2, S=4, W=8. Masks with three or four land
+# sides have no dedicated sprite; remove_spurs turns those tiles into land.
+AUTOTILE_SPRITES = [
+    "water_mm",  # 0: open water
+    "water_mt",  # 1: N
+    "water_rm",  # 2: E
+    "water_rt",  # 3: N E
+    "water_mb",  # 4: S
+    "water_h",   # 5: N S, horizontal channel
+    "water_rb",  # 6: E S
+    "water_h",   # 7: N E S
+    "water_lm",  # 8: W
+    "water_lt",  # 9: N W
+    "water_v",   # 10: E W, vertical channel
+    "water_v",   # 11: N E W
+    "water_lb",  # 12: S W
+    "water_h",   # 13: N S W
+    "water_v",   # 14: E S W
+    "water_mm",  # 15: N E S W
+]
+
+def autotile_table(tile_to_sprite, land_sprite="ground1"):
+    """
+    Build the tile ID lookup used by autotile from a tile ID -> sprite name mapping.
+    :return: (array of 16 water tile IDs indexed by land bitmask, land tile ID).
+    """
+    sprite_to_tile = {}
+    for tile_id, sprite_name in sorted(tile_to_sprite.items()):
+        sprite_to_tile.setdefault(sprite_name, tile_id)
+    table = np.array([sprite_to_tile[name] for name in AUTOTILE_SPRITES], dtype=np.uint16)
+    return table, sprite_to_tile[land_sprite]
+
+def land_sides(water):
+    """
+    Return the bitmask of 4-neighbors that are land (N=1, E=2, S=4, W=8) for every tile.
+    Tiles beyond the map edge count as water, so lakes can run off the map.
+    """
+    padded = np.pad(water, 1, mode="constant", constant_values=True)
+    mask = (~padded[:-2, 1:-1]).astype(np.uint8)  # N
+    mask |= (~padded[1:-1, 2:]).astype(np.uint8) << 1  # E
+    mask |= (~padded[2:, 1:-1]).astype(np.uint8) << 2  # S
+    mask |= (~padded[1:-1, :-2]).astype(np.uint8) << 3  # W
+    return mask
+
+def remove_spurs(water):
+    """Turn water tiles with land on three or four sides into land until none are left."""
+    counts = np.array([bin(mask).count("1") for mask in range(16)], dtype=np.uint8)
+    spurs = np.nonzero(water & (counts[land_sides(water)] >= 3))
+
+    # Removing a spur can only create new spurs next to it, so later passes
+    # only look at the neighbors of the tiles just removed
+    height, width = water.shape
+    padded = np.pad(water, 1, mode="constant", constant_values=True)
+    rows, cols = spurs[0] + 1, spurs[1] + 1
+    while len(rows):
+        padded[rows, cols] = False
+        rows = np.concatenate([rows - 1, rows + 1, rows, rows])
+        cols = np.concatenate([cols, cols, cols - 1, cols + 1])
+        keep = (rows >= 1) & (rows <= height) & (cols >= 1) & (cols <= width)
+        rows, cols = rows[keep], cols[keep]
+        keep = padded[rows, cols]
+        rows, cols = rows[keep], cols[keep]
+        land = ((~padded[rows - 1, cols]).astype(np.uint8) + ~padded[rows + 1, cols] +
+                ~padded[rows, cols - 1] + ~padded[rows, cols + 1])
+        rows, cols = rows[land >= 3], cols[land >= 3]
+    return padded[1:-1, 1:-1]
+
+def autotile(water, table, land_tile):
+    """
+    Convert a water mask into tile IDs in one pass, picking edge, corner and
+    channel sprites from each water tile's land neighbors.
+    :param water: 2D boolean array, True for water.
+    :param table: Water tile IDs indexed by land bitmask, from autotile_table.
+    :param land_tile: Tile ID for land.
+    :return: 2D uint16 array of tile IDs.
+    """
+    return np.where(water, table[land_sides(water)], np.uint16(land_tile)).astype(np.uint16)
+
+def value_noise(rng, height, width, feature_size, octaves=4, persistence=0.5):
+    """
+    Fractal value noise in [0, 1): random values on a coarse grid, smoothly
+    interpolated, summed over octaves of halving feature size.
+    """
+    noise = np.zeros((height, width), dtype=np.float32)
+    amplitude = 1.0
+    total = 0.0
+    cell = float(feature_size)
+    for _ in range(octaves):
+        grid = rng.random((int(height / cell) + 2, int(width / cell) + 2), dtype=np.float32)
+        y = np.arange(height, dtype=np.float32) / cell
+        x = np.arange(width, dtype=np.float32) / cell
+        y0 = y.astype(np.int64)
+        x0 = x.astype(np.int64)
+        fy = y - y0
+        fx = x - x0
+        fy = (fy * fy * (3 - 2 * fy))[:, None]  # Smoothstep
+        fx = (fx * fx * (3 - 2 * fx))[None, :]
+
+        # Separable interpolation: along x on the coarse rows, then along y
+        rows = grid[:, x0] * (1 - fx) + grid[:, x0 + 1] * fx
+        rows *= amplitude
+        top = rows[y0]
+        top *= 1 - fy
+        noise += top
+        bottom = rows[y0 + 1]
+        bottom *= fy
+        noise += bottom
+
+        total += amplitude
+        amplitude *= persistence
+        cell = max(1.0, cell / 2)
+    return noise / total
+
+def smooth(water, passes):
+    """Cellular automaton passes: a tile becomes water when most of its 8 neighbors are."""
+    for _ in range(passes):
+        padded = np.pad(water, 1, mode="edge").astype(np.uint8)
+        height, width = water.shape
+        count = sum(padded[1 + dy:1 + dy + height, 1 + dx:1 + dx + width]
+                    for dy in (-1, 0, 1) for dx in (-1, 0, 1) if dy or dx)
+        water = (count >= 5) | (water & (count == 4))
+    return water
+
+def generate_water(width, height, seed, water_fraction=0.3, feature_size=24, smoothing_passes=4):
+    """
+    Generate an irregular water mask: thresholded noise smoothed by cellular passes.
+    :param seed: Seed for numpy.random.default_rng; the same seed gives the same map.
+    :param water_fraction: Approximate share of the map covered by water.
+    :param feature_size: Approximate size of lakes and coastline features, in tiles.
+    :param smoothing_passes: Number of cellular smoothing passes.
+    """
+    rng = np.random.default_rng(seed)
+    noise = value_noise(rng, height, width, feature_size)
+    water = noise < np.quantile(noise, water_fraction)
+    return remove_spurs(smooth(water, smoothing_passes))
+
+def generate_tiles(width, height, seed, table, land_tile, water_fraction=0.3, feature_size=24,
+                   smoothing_passes=4):
+    """
+    Generate an autotiled map. Takes only picklable arguments so it can run in a worker process.
+    :param table: Water tile IDs indexed by land bitmask, from autotile_table.
+    :param land_tile: Tile ID for land.
+    :return: 2D uint16 array of tile IDs.
+    """
+    water = generate_water(width, height, seed, water_fraction, feature_size, smoothing_passes)
+    return autotile(water, table, land_tile)
+
+class BackgroundMapGenerator:
+    """
+    Runs generate_tiles in a worker process, so a map can be generated while
+    the main menu keeps rendering. Falls back to generating in-process when
+    worker processes are unavailable.
+    """
+
+    def __init__(self):
+        self.executor = None
+        self.future = None
+        self.tiles = None
+
+    def start(self, *args, **kwargs):
+        """Start generating a map; takes the arguments of generate_tiles."""
+        self.tiles = None
+        try:
+            self.executor = ProcessPoolExecutor(max_workers=1)
+            self.future = self.executor.submit(generate_tiles, *args, **kwargs)
+        except (OSError, NotImplementedError):
+            self.executor = None
+            self.future = None
+            self.tiles = generate_tiles(*args, **kwargs)
+
+    def is_pending(self):
+        """Whether a map was started and has not been collected yet."""
+        return self.future is not None or self.tiles is not None
+
+    def is_ready(self):
+        """Whether the map can be collected without waiting."""
+        return self.tiles is not None or (self.future is not None and self.future.done())
+
+    def result(self):
+        """Return the generated tiles, waiting for the worker if it is still running."""
+        if self.future is not None:
+            self.tiles = self.future.result()
+            self.future = None
+            self.executor.shutdown()
+            self.executor = None
+        tiles, self.tiles = self.tiles, None
+        return tiles
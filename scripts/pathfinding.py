@@ -0,0 +1,266 @@
+import numpy as np
+
+class FlowField:
+    """
+    Shared flow field toward a set of goal tiles, computed once for every unit.
+
+    A breadth-first distance field is grown from the goals over passable tiles,
+    then every tile points at its neighbor closest to a goal, so a unit's next
+    step is a single array lookup. The field listens to World tile edits and
+    repairs only the cells affected by a changed region.
+
+    Arrays are kept flat with a one-tile impassable border, so the four
+    neighbors of flat index i are i - 1, i + 1, i - stride and i + stride.
+    """
+    UNREACHABLE = np.iinfo(np.int32).max
+    REPAIR_LIMIT = 0.25  # Share of the grid above which a repair recomputes the whole field instead
+    SMALL_FRONTIER = 16  # Frontiers below this size are expanded cell by cell, see relax
+
+    def __init__(self, world, goals, terrain=("water",)):
+        """
+        Initialize and compute the flow field.
+        :param world: World whose tiles are traversed.
+        :param goals: List of (row, col) goal tiles.
+        :param terrain: Names of the terrain classes units can move through.
+        """
+        self.world = world
+        self.terrain = tuple(terrain)
+        self.height = world.height_in_tiles
+        self.width = world.width_in_tiles
+        self.stride = self.width + 2
+        self.offsets = np.array([-1, 1, -self.stride, self.stride], dtype=np.int64)
+        self.opposite = np.array([1, 0, 3, 2], dtype=np.int8)  # Index of the offset pointing back
+        # Row/column step of each offset, used to build direction arrays
+        self.offset_rows = np.array([0, 0, -1, 1, 0], dtype=np.int8)  # Last entry: no move
+        self.offset_cols = np.array([-1, 1, 0, 0, 0], dtype=np.int8)
+
+        size = (self.height + 2) * self.stride
+        self.passable = np.zeros(size, dtype=bool)
+        self.distance = np.full(size, self.UNREACHABLE, dtype=np.int32)
+        self.direction = np.full(size, 4, dtype=np.int8)  # Index into offsets, 4 for none
+        self.marked = np.zeros(size, dtype=bool)  # Scratch mask for incremental updates
+        self.owner = np.zeros(size, dtype=np.int64)  # Scratch array used to drop duplicate cells
+        self.passable_table = None  # Passability per tile ID, see passable_tiles
+
+        self.pending = []  # Regions edited since the last refresh
+        self.set_goals(goals)
+        world.add_listener(self.on_tiles_changed)
+
+    def detach(self):
+        """Stop following the world's tile edits."""
+        self.world.remove_listener(self.on_tiles_changed)
+
+    def flat_index(self, rows, cols):
+        """Convert tile rows/columns to flat indices into the padded arrays."""
+        return (np.asarray(rows) + 1) * self.stride + np.asarray(cols) + 1
+
+    def interior(self, array):
+        """Return the (height, width) view of a padded flat array without its border."""
+        return array.reshape(self.height + 2, self.stride)[1:-1, 1:-1]
+
+    def passable_tiles(self, tiles):
+        """Return the passability mask of a block of tile IDs."""
+        world = self.world
+        if self.passable_table is None:
+            classes = [world.terrain_names.index(name) for name in self.terrain if name in world.terrain_names]
+            self.passable_table = np.isin(world.tile_terrain, classes)
+        return world.tile_attribute(self.passable_table, tiles)
+
+    def drop_duplicates(self, cells):
+        """Return flat indices without repeats, in no particular order, without sorting."""
+        order = np.arange(len(cells))
+        self.owner[cells] = order
+        return cells[self.owner[cells] == order]  # Keep the last occurrence of each cell
+
+    def set_goals(self, goals):
+        """Change the goal tiles and recompute the whole field."""
+        self.goals = [tuple(goal) for goal in goals]
+        self.compute()
+
+    def compute(self):
+        """Recompute passability, distances and directions for the whole world."""
+        self.pending.clear()
+        self.passable_table = None  # Tile definitions may have been reloaded
+        self.interior(self.passable)[:] = self.passable_tiles(self.world.tiles[:, :])
+        self.distance.fill(self.UNREACHABLE)
+
+        seeds = self.goal_indices()
+        self.distance[seeds] = 0
+        self.relax(seeds)
+        self.update_directions(None)
+
+    def goal_indices(self):
+        """Flat indices of the passable goal tiles."""
+        if not self.goals:
+            return np.zeros(0, dtype=np.int64)
+        rows, cols = np.array(self.goals).T
+        indices = self.flat_index(rows, cols)
+        return indices[self.passable[indices]]
+
+    def relax(self, seeds):
+        """
+        Grow distances outward from seed cells, which already hold their distance.
+        Seeds are released level by level (a bucketed breadth-first search), so
+        every cell of a frontier has the same distance and is settled exactly once.
+        Each offset is expanded separately: a cell reached through one offset
+        already holds the new distance when the next is checked, so a frontier
+        never holds duplicates and needs no deduplication.
+        :return: Flat indices of the seeds and of every cell whose distance changed.
+        """
+        seeds = seeds[np.argsort(self.distance[seeds], kind="stable")]
+        seed_distance = self.distance[seeds]
+        changed = [seeds]
+        frontier = seeds[:0]
+        start = 0
+        level = 0
+        passable, distance = self.passable, self.distance
+        offsets = self.offsets.tolist()
+        while len(frontier) or start < len(seeds):
+            if start < len(seeds) and (not len(frontier) or seed_distance[start] <= level):
+                level = seed_distance[start] if not len(frontier) else level
+                end = np.searchsorted(seed_distance, level, side="right")
+                frontier = np.concatenate([frontier, seeds[start:end]])
+                start = end
+
+            level += 1
+            cells = []
+            if len(frontier) < self.SMALL_FRONTIER:
+                # A few cells (e.g. along a narrow channel): numpy call overhead would dominate
+                for cell in frontier.tolist():
+                    for offset in offsets:
+                        neighbor = cell + offset
+                        if passable[neighbor] and distance[neighbor] > level:
+                            distance[neighbor] = level
+                            cells.append(neighbor)
+                frontier = np.array(cells, dtype=np.int64)
+            else:
+                for offset in offsets:
+                    neighbors = frontier + offset
+                    neighbors = neighbors[passable.take(neighbors) & (distance.take(neighbors) > level)]
+                    distance[neighbors] = level
+                    cells.append(neighbors)
+                frontier = np.concatenate(cells)
+            changed.append(frontier)
+        return np.concatenate(changed)
+
+    def update_directions(self, cells):
+        """
+        Point cells at their neighbor with the smallest distance.
+        :param cells: Flat indices to update, or None for every interior cell.
+        """
+        if cells is None:
+            # Whole map: compare shifted views of the padded grid instead of gathering
+            grid = self.distance.reshape(self.height + 2, self.stride)
+            center = grid[1:-1, 1:-1]
+            neighbors = (grid[1:-1, :-2], grid[1:-1, 2:], grid[:-2, 1:-1], grid[2:, 1:-1])
+            best_distance = center.copy()
+            best = np.full(center.shape, 4, dtype=np.int8)
+            for index, neighbor in enumerate(neighbors):
+                closer = neighbor < best_distance
+                best[closer] = index
+                np.minimum(best_distance, neighbor, out=best_distance)
+            best[(center == 0) | (center == self.UNREACHABLE)] = 4
+            self.interior(self.direction)[:] = best
+            return
+
+        cells = cells[(cells >= self.stride) & (cells < len(self.distance) - self.stride)]
+        neighbor_distance = self.distance[cells[:, None] + self.offsets]
+        best = neighbor_distance.argmin(axis=1).astype(np.int8)
+        # Goals, blocked and unreachable cells do not move
+        still = ((self.distance[cells] == 0) | (self.distance[cells] == self.UNREACHABLE) |
+                 (neighbor_distance.min(axis=1) >= self.distance[cells]))
+        best[still] = 4
+        self.direction[cells] = best
+
+    def on_tiles_changed(self, top_left=None, bottom_right=None):
+        """World listener: remember an edited region (None for the whole world)."""
+        self.pending.append((top_left, bottom_right))
+
+    def refresh(self):
+        """Apply the tile edits made since the last refresh."""
+        if not self.pending:
+            return
+        if any(top_left is None for top_left, _ in self.pending):
+            self.compute()
+            return
+        regions = self.pending[:]
+        self.pending.clear()
+        for top_left, bottom_right in regions:
+            self.update_region(top_left, bottom_right)
+
+    def update_region(self, top_left, bottom_right):
+        """
+        Repair the field after the tiles of a rectangle changed.
+        Newly blocked cells invalidate every cell whose path ran through them;
+        those cells and newly opened ones are then re-relaxed from their valid
+        neighbors. Cells outside the affected area are never visited.
+        """
+        row1, col1 = top_left
+        row2, col2 = bottom_right
+        new_passable = self.passable_tiles(self.world.tiles[row1:row2+1, col1:col2+1])
+        old_passable = self.interior(self.passable)[row1:row2+1, col1:col2+1]
+        rows, cols = np.nonzero(new_passable != old_passable)
+        if len(rows) == 0:
+            return
+        cells = self.flat_index(rows + row1, cols + col1)
+        old_passable[rows, cols] = new_passable[rows, cols]  # Writes through to self.passable
+
+        opened = cells[self.passable[cells]]
+        blocked = cells[~self.passable[cells]]
+
+        # Cells downstream of a blocked cell: a cell depends on the neighbor it points
+        # at, so the neighbors of the frontier pointing back at it are the next level
+        limit = self.REPAIR_LIMIT * self.height * self.width
+        affected = blocked
+        if len(blocked):
+            self.marked[blocked] = True
+            frontier = blocked
+            found = [blocked]
+            count = len(blocked)
+            while len(frontier) and count <= limit:
+                neighbors = frontier[:, None] + self.offsets
+                downstream = neighbors[self.direction[neighbors] == self.opposite]
+                downstream = downstream[~self.marked[downstream]]  # Skip blocked cells
+                self.marked[downstream] = True
+                found.append(downstream)
+                count += len(downstream)
+                frontier = downstream
+            affected = np.concatenate(found)
+            self.marked[affected] = False
+            if count > limit:
+                self.compute()  # Most of the field changes, a full pass is cheaper
+                return
+            self.distance[affected] = self.UNREACHABLE
+
+        # Re-seed from the valid neighbors of everything that was reset or opened
+        reset = np.concatenate([affected, opened])
+        self.distance[opened] = self.UNREACHABLE
+        goals = self.goal_indices()
+        self.distance[goals] = 0
+        border = (reset[:, None] + self.offsets).ravel()
+        border = border[self.passable[border] & (self.distance[border] < self.UNREACHABLE)]
+        changed = self.relax(self.drop_duplicates(np.concatenate([border, goals])))
+
+        touched = np.concatenate([reset, changed])
+        if len(touched) > limit:
+            self.update_directions(None)
+        else:
+            self.update_directions(self.drop_duplicates((touched[:, None] + np.append(self.offsets, 0)).ravel()))
+
+    def get_distance(self, row, col):
+        """Return the number of steps from a tile to the nearest goal (None if unreachable)."""
+        self.refresh()
+        distance = int(self.distance[self.flat_index(row, col)])
+        return None if distance == self.UNREACHABLE else distance
+
+    def get_direction(self, row, col):
+        """Return the (row step, col step) to take from a tile, (0, 0) at goals or if unreachable."""
+        self.refresh()
+        direction = self.direction[self.flat_index(row, col)]
+        return int(self.offset_rows[direction]), int(self.offset_cols[direction])
+
+    def get_directions(self, rows, cols):
+        """Vectorized get_direction for many units: returns (row steps, col steps) arrays."""
+        self.refresh()
+        directions = self.direction[self.flat_index(rows, cols)]
+        return self.offset_rows[directions], self.offset_cols[directions]
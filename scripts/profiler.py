@@ -0,0 +1,124 @@
+import time
+
+import numpy as np
+import pygame
+
+class ProfilerSection:
+    def __init__(self, profiler, index):
+        """Reusable context manager timing one section of a FrameProfiler."""
+        self.profiler = profiler
+        self.index = index
+
+    def __enter__(self):
+        self.profiler.starts[self.index] = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.profiler.stop_index(self.index)
+        return False
+
+
+class FrameProfiler:
+    def __init__(self, sections, history=300):
+        """
+        Initialize the profiler.
+        :param sections: Names of the timed sections, in display order.
+        :param history: Number of frames kept in the ring buffer.
+        """
+        self.section_names = list(sections)
+        self.index = {name: i for i, name in enumerate(self.section_names)}
+        self.history = history
+
+        # Ring buffer of section times in milliseconds, one row per frame.
+        # Everything is allocated up front so timing a frame allocates nothing.
+        self.samples = np.zeros((history, len(self.section_names)), dtype=np.float64)
+        self.row = 0  # Row of the frame being recorded
+        self.frames = 0  # Number of completed frames (capped at history)
+        self.starts = [0.0] * len(self.section_names)
+        self.sections = {name: ProfilerSection(self, i) for name, i in self.index.items()}
+
+        # Overlay
+        self.show_overlay = False
+        self.font = None
+
+    def begin_frame(self):
+        """Start recording a new frame."""
+        self.samples[self.row] = 0.0
+
+    def end_frame(self):
+        """Finish the current frame and advance the ring buffer."""
+        self.row = (self.row + 1) % self.history
+        self.frames = min(self.frames + 1, self.history)
+
+    def start(self, name):
+        """Start timing a section."""
+        self.starts[self.index[name]] = time.perf_counter()
+
+    def stop(self, name):
+        """Stop timing a section. A section timed several times per frame accumulates."""
+        self.stop_index(self.index[name])
+
+    def stop_index(self, index):
+        self.samples[self.row, index] += (time.perf_counter() - self.starts[index]) * 1000.0
+
+    def section(self, name):
+        """Return the context manager timing a section: `with profiler.section("world"): ...`"""
+        return self.sections[name]
+
+    def ordered_samples(self):
+        """Return the completed frames in the buffer, oldest first."""
+        if self.frames < self.history:
+            return self.samples[:self.frames]
+        return np.roll(self.samples, -self.row, axis=0)
+
+    def get_stats(self):
+        """Return {section: (avg, p95, max)} in milliseconds over the buffered frames."""
+        samples = self.ordered_samples()
+        if len(samples) == 0:
+            return {name: (0.0, 0.0, 0.0) for name in self.section_names}
+        avg = samples.mean(axis=0)
+        p95 = np.percentile(samples, 95, axis=0)
+        peak = samples.max(axis=0)
+        return {name: (avg[i], p95[i], peak[i]) for name, i in self.index.items()}
+
+    def dump_csv(self, path=None):
+        """
+        Write the buffered frames to a CSV file, one row per frame.
+        :param path: File to write, defaults to profile_<timestamp>.csv.
+        :return: The path written.
+        """
+        if path is None:
+            path = time.strftime("profile_%Y%m%d_%H%M%S.csv")
+        header = "frame," + ",".join(self.section_names)
+        samples = self.ordered_samples()
+        frames = np.arange(len(samples)).reshape(-1, 1)
+        np.savetxt(path, np.hstack([frames, samples]), delimiter=",", header=header,
+                   comments="", fmt=["%d"] + ["%.4f"] * len(self.section_names))
+        print(f"Profile written to {path}")
+        return path
+
+    def toggle_overlay(self):
+        """Toggle the visibility of the profiler overlay."""
+        self.show_overlay = not self.show_overlay
+
+    def render(self, screen):
+        """
+        Render the rolling avg/p95/max per section in the bottom-left corner of the screen.
+        :return: The Rect covered by the overlay.
+        """
+        if self.font is None:
+            self.font = pygame.font.SysFont("monospace", 14)
+
+        lines = [f"{'section':<10}{'avg':>8}{'p95':>8}{'max':>8}  ms"]
+        for name, (avg, p95, peak) in self.get_stats().items():
+            lines.append(f"{name:<10}{avg:8.2f}{p95:8.2f}{peak:8.2f}")
+
+        line_height = self.font.get_linesize()
+        panel = pygame.Surface((230, line_height * len(lines) + 10))
+        panel.set_alpha(180)
+        y = screen.get_height() - panel.get_height() - 10
+        screen.blit(panel, (10, y))
+        for i, line in enumerate(lines):
+            text_surface = self.font.render(line, True, (255, 255, 0))
+            screen.blit(text_surface, (15, y + 5 + i * line_height))
+        return pygame.Rect((10, y), panel.get_size())
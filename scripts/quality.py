@@ -0,0 +1,67 @@
+import numpy as np
+
+class QualityGovernor:
+    """
+    Holds a frame time budget by stepping through quality levels. Frame times
+    are kept in a rolling window; when its average goes over the budget the
+    governor steps down a level, and when it stays well under the budget it
+    steps back up. The gap between the two thresholds, and waiting for a full
+    window of frames after every change, keep it from oscillating.
+    """
+
+    def __init__(self, levels, target_fps=60, window=60, downgrade_at=1.1, upgrade_at=0.6, level=None):
+        """
+        Initialize the governor.
+        :param levels: Knob settings for each quality level, lowest first, e.g.
+                       [{"effects_limit": 256, "render_resolution": 0.5, ...}, ...].
+        :param target_fps: Frame rate to hold; the budget is 1 / target_fps seconds.
+        :param window: Number of frames averaged before deciding.
+        :param downgrade_at: Step down when the average frame time exceeds this fraction of the budget.
+        :param upgrade_at: Step up when the average frame time is below this fraction of the budget.
+        :param level: Starting level, None for the highest.
+        """
+        if not levels:
+            raise ValueError("QualityGovernor needs at least one quality level")
+        self.levels = levels
+        self.budget = 1.0 / target_fps
+        self.downgrade_at = downgrade_at
+        self.upgrade_at = upgrade_at
+        self.level = len(levels) - 1 if level is None else max(0, min(level, len(levels) - 1))
+
+        # Ring buffer of frame times in seconds
+        self.frame_times = np.zeros(window, dtype=np.float64)
+        self.count = 0  # Frames recorded since the last level change
+
+    @property
+    def knobs(self):
+        """Knob settings of the current level."""
+        return self.levels[self.level]
+
+    def record(self, frame_time):
+        """
+        Record the time spent on one frame (excluding any frame rate cap sleep).
+        :return: True if the quality level changed.
+        """
+        window = len(self.frame_times)
+        self.frame_times[self.count % window] = frame_time
+        self.count += 1
+        if self.count < window:
+            return False
+
+        average = self.frame_times.mean()
+        if average > self.budget * self.downgrade_at and self.level > 0:
+            self.set_level(self.level - 1)
+            return True
+        if average < self.budget * self.upgrade_at and self.level < len(self.levels) - 1:
+            self.set_level(self.level + 1)
+            return True
+        return False
+
+    def reset(self):
+        """Discard the recorded frames, e.g. after a state change or loading."""
+        self.count = 0
+
+    def set_level(self, level):
+        """Switch to a quality level and start a new window of frames."""
+        self.level = max(0, min(level, len(self.levels) - 1))
+        self.count = 0
@@ -0,0 +1,246 @@
+import json
+import os
+import struct
+import threading
+import zlib
+
+import numpy as np
+
+# File layout: magic, version and header size, a JSON header, then the raw
+# sections it lists. Sections start on ALIGNMENT byte boundaries so uncompressed
+# tile chunks can be memory-mapped straight from the file.
+SAVE_MAGIC = b"TDSAVE\0\0"
+SAVE_VERSION = 1
+PRELUDE = struct.Struct("<8sII")  # magic, version, header size
+ALIGNMENT = 64
+
+def take_snapshot(world, effects=None, state=None, rng=None):
+    """
+    Capture the game for saving, cheaply enough to do in the middle of a frame.
+    Tile layers are captured copy-on-write (see TileStorage.snapshot), so no tile
+    data is copied here; the small entity arrays are copied.
+    :param world: World to save: every tile layer, the view and the seed.
+    :param effects: EffectsSystem whose active effects are saved, if any.
+    :param state: JSON-serializable game state to save along, e.g. the simulation time.
+    :param rng: numpy Generator whose state is saved, if any.
+    :return: Snapshot to pass to write_snapshot (or BackgroundSaveWriter.start).
+    """
+    header = {
+        "world": {
+            "width": world.width_in_tiles,
+            "height": world.height_in_tiles,
+            "seed": None if world.seed is None else int(world.seed),
+            "view": [float(world.world_x), float(world.world_y)],
+            "scale": world.scale,
+        },
+        "rng": rng.bit_generator.state if rng is not None else None,
+        "state": state or {},
+        "sprite_ids": [],
+    }
+    arrays = {}
+    if effects is not None:
+        effect_arrays, header["sprite_ids"] = effects.get_state()
+        arrays.update({f"effects.{name}": values for name, values in effect_arrays.items()})
+    layers = {name: layer.tiles.snapshot() for name, layer in world.layers.items()}
+    return {"header": header, "layers": layers, "arrays": arrays}
+
+def save_file_paths(path):
+    """
+    Return the two files a save alternates between: path itself and path with
+    ".1" before the extension. A restored world memory-maps the file it was
+    loaded from, which cannot be replaced on every platform, so saves go to
+    whichever file the world does not map (see get_save_target).
+    """
+    root, extension = os.path.splitext(path)
+    return path, f"{root}.1{extension}"
+
+def get_save_target(world, path):
+    """
+    Pick the file to write a save to without touching the tile data, so it is
+    cheap enough to call on the main thread before take_snapshot.
+    :param world: World about to be saved.
+    :param path: Save file path from the configuration.
+    :return: The first of save_file_paths(path) the world does not memory-map.
+    """
+    mapped = set()
+    for layer in world.layers.values():
+        chunks = layer.tiles.chunks
+        if isinstance(chunks, np.memmap) and chunks.filename:
+            mapped.add(os.path.normcase(os.path.abspath(chunks.filename)))
+    paths = save_file_paths(path)
+    for candidate in paths:
+        if os.path.normcase(os.path.abspath(candidate)) not in mapped:
+            return candidate
+    return paths[0]
+
+def find_latest_save(path):
+    """Return the most recently written of save_file_paths(path), None if neither exists."""
+    existing = [candidate for candidate in save_file_paths(path) if os.path.exists(candidate)]
+    return max(existing, key=os.path.getmtime, default=None)
+
+def release_snapshot(snapshot):
+    """Release the tile snapshots of a snapshot that will not be written."""
+    for tiles in snapshot["layers"].values():
+        tiles.release()
+
+def snapshot_chunks(tiles):
+    """Yield the chunks of a TileSnapshot in file order."""
+    chunk_rows, chunk_cols = tiles.chunks.shape[:2]
+    for chunk_row in range(chunk_rows):
+        for chunk_col in range(chunk_cols):
+            yield tiles.get_chunk(chunk_row, chunk_col)
+
+def write_snapshot(path, snapshot, compress=False):
+    """
+    Write a snapshot to a save file, then release it. The file is written next
+    to the destination and renamed over it, so an interrupted write leaves the
+    previous save intact. Replacing a save that a restored world still maps
+    fails on Windows; pick the path with get_save_target.
+    :param path: Save file path.
+    :param snapshot: Snapshot from take_snapshot.
+    :param compress: zlib-compress the sections; compressed tiles cannot be memory-mapped on load.
+    """
+    try:
+        # Tile layers are written in their chunk layout, one chunk at a time
+        sections = []  # (name, kind, dtype, shape, payload)
+        for name, tiles in snapshot["layers"].items():
+            sections.append((name, "layer", tiles.dtype, tiles.chunks.shape, snapshot_chunks(tiles)))
+        for name, values in snapshot["arrays"].items():
+            sections.append((name, "array", values.dtype, values.shape, (values,)))
+
+        # Compressed sections are built up front, since their size goes in the header
+        entries = {"layers": {}, "arrays": {}}
+        payloads = []
+        offset = 0
+        for name, kind, dtype, shape, blocks in sections:
+            if compress:
+                compressor = zlib.compressobj(1)
+                data = b"".join([compressor.compress(np.ascontiguousarray(block)) for block in blocks])
+                blocks = [data + compressor.flush()]
+                size = len(blocks[0])
+            else:
+                size = int(np.prod(shape)) * dtype.itemsize
+            entries[kind + "s"][name] = {"dtype": dtype.str, "shape": list(shape), "offset": offset,
+                                         "size": size, "compression": "zlib" if compress else None}
+            payloads.append((offset, blocks))
+            offset += -(-size // ALIGNMENT) * ALIGNMENT
+
+        header = dict(snapshot["header"], version=SAVE_VERSION, **entries)
+        header_bytes = json.dumps(header).encode()
+        data_start = -(-(PRELUDE.size + len(header_bytes)) // ALIGNMENT) * ALIGNMENT
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        temp_path = path + ".tmp"
+        with open(temp_path, "wb") as file:
+            file.write(PRELUDE.pack(SAVE_MAGIC, SAVE_VERSION, len(header_bytes)))
+            file.write(header_bytes)
+            for offset, blocks in payloads:
+                file.seek(data_start + offset)
+                for block in blocks:
+                    file.write(np.ascontiguousarray(block) if isinstance(block, np.ndarray) else block)
+        os.replace(temp_path, path)
+    finally:
+        release_snapshot(snapshot)
+
+def load_snapshot(path, mmap=True):
+    """
+    Read a save file.
+    :param path: Save file path.
+    :param mmap: Memory-map uncompressed tile layers (copy-on-write, the file is never
+                 modified) instead of reading them, so restoring a huge map is instant.
+    :return: (header, {layer name: chunk array}, {array name: array}).
+    """
+    with open(path, "rb") as file:
+        magic, version, header_size = PRELUDE.unpack(file.read(PRELUDE.size))
+        if magic != SAVE_MAGIC:
+            raise ValueError(f"'{path}' is not a save file")
+        if version > SAVE_VERSION:
+            raise ValueError(f"Save file '{path}' is version {version}, newer than {SAVE_VERSION}")
+        header = json.loads(file.read(header_size))
+        data_start = -(-(PRELUDE.size + header_size) // ALIGNMENT) * ALIGNMENT
+
+        def read_section(entry, can_map):
+            dtype = np.dtype(entry["dtype"])
+            shape = tuple(entry["shape"])
+            if entry["compression"] is None and can_map:
+                return np.memmap(path, dtype=dtype, mode="c", offset=data_start + entry["offset"], shape=shape)
+            file.seek(data_start + entry["offset"])
+            data = file.read(entry["size"])
+            if entry["compression"] == "zlib":
+                data = zlib.decompress(data)
+            return np.frombuffer(data, dtype=dtype).reshape(shape).copy()
+
+        layers = {name: read_section(entry, mmap) for name, entry in header["layers"].items()}
+        arrays = {name: read_section(entry, False) for name, entry in header["arrays"].items()}
+    return header, layers, arrays
+
+def restore_snapshot(path, world, effects=None, rng=None, mmap=True):
+    """
+    Restore a save file into a World (and optionally effects and a Generator).
+    Tile layers of in-memory worlds take over the memory-mapped sections of
+    the file; file-backed layers are copied into.
+    :return: The game state saved with take_snapshot.
+    """
+    header, layers, arrays = load_snapshot(path, mmap)
+    saved_world = header["world"]
+    if (saved_world["width"], saved_world["height"]) != (world.width_in_tiles, world.height_in_tiles):
+        raise ValueError(f"Save file '{path}' holds a {saved_world['width']}x{saved_world['height']} map, "
+                         f"not {world.width_in_tiles}x{world.height_in_tiles}")
+
+    for name, chunks in layers.items():
+        if name not in world.layers:
+            continue
+        tiles = world.get_layer(name).tiles
+        if tiles.path is None and chunks.shape == tiles.chunks.shape and chunks.dtype == tiles.dtype:
+            tiles.map_chunks(chunks)
+        else:
+            size = chunks.shape[2]
+            tiles[:, :] = chunks.transpose(0, 2, 1, 3).reshape(chunks.shape[0] * size, chunks.shape[1] * size)[
+                :world.height_in_tiles, :world.width_in_tiles]
+        world.invalidate_region(layer=name)
+
+    world.seed = saved_world["seed"]
+    world.scale = world.snap_scale(saved_world["scale"])
+    world.set_view(*saved_world["view"])
+    world.begin_update()
+
+    if effects is not None:
+        prefix = "effects."
+        effects.set_state({name[len(prefix):]: values for name, values in arrays.items()
+                           if name.startswith(prefix)}, header["sprite_ids"])
+    if rng is not None and header["rng"] is not None:
+        rng.bit_generator.state = header["rng"]
+    return header["state"]
+
+class BackgroundSaveWriter:
+    """
+    Writes snapshots on a background thread, so saving (and autosaving) never
+    stalls a frame. One save is written at a time.
+    """
+
+    def __init__(self):
+        self.thread = None
+
+    def start(self, path, snapshot, compress=False):
+        """Start writing a snapshot from take_snapshot; waits for the previous save first."""
+        self.wait()
+        self.thread = threading.Thread(target=self.run, args=(path, snapshot, compress), daemon=True)
+        self.thread.start()
+
+    def run(self, path, snapshot, compress):
+        try:
+            write_snapshot(path, snapshot, compress)
+        except (OSError, ValueError) as e:
+            print(f"Error writing save file '{path}': {e}")
+
+    def is_pending(self):
+        """Whether a save is still being written."""
+        return self.thread is not None and self.thread.is_alive()
+
+    def wait(self):
+        """Wait for the save being written, if any."""
+        if self.thread is not None:
+            self.thread.join()
+            self.thread = None
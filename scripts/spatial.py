@@ -0,0 +1,192 @@
+import numpy as np
+
+class SpatialHash:
+    """
+    Uniform-grid spatial index over entity positions (world pixels).
+
+    Entities live in numpy arrays indexed by entity ID; each grid cell keeps the
+    set of IDs inside it, so insert, move and remove only touch one or two cells.
+    Queries return numpy arrays of entity IDs.
+    """
+    KEY_OFFSET = 1 << 15  # Lets cells at negative coordinates have non-negative keys
+    KEY_STRIDE = 1 << 20
+
+    def __init__(self, cell_size, capacity=1024):
+        """
+        Initialize the index.
+        :param cell_size: Width and height of a grid cell in pixels.
+        :param capacity: Initial number of entity slots (grows as needed).
+        """
+        self.cell_size = cell_size
+        self.x = np.zeros(capacity, dtype=np.float64)
+        self.y = np.zeros(capacity, dtype=np.float64)
+        self.cell = np.zeros(capacity, dtype=np.int64)  # Cell key of each entity
+        self.active = np.zeros(capacity, dtype=bool)
+        self.cells = {}  # cell key -> set of entity IDs
+        self.free = []  # Recycled entity IDs
+        self.next_id = 0
+        self.count = 0
+
+    @classmethod
+    def for_world(cls, world, tiles_per_cell=4, capacity=1024):
+        """Create an index whose cells are aligned to blocks of the world's tiles."""
+        return cls(world.tile_size * tiles_per_cell, capacity)
+
+    def point_key(self, x, y):
+        """Return the cell key of a single position (plain Python, for the per-entity paths)."""
+        return ((int(y // self.cell_size) + self.KEY_OFFSET) * self.KEY_STRIDE
+                + int(x // self.cell_size) + self.KEY_OFFSET)
+
+    def cell_key(self, x, y):
+        """Return the cell keys of arrays of positions."""
+        cell_x = np.floor_divide(x, self.cell_size).astype(np.int64) + self.KEY_OFFSET
+        cell_y = np.floor_divide(y, self.cell_size).astype(np.int64) + self.KEY_OFFSET
+        return cell_y * self.KEY_STRIDE + cell_x
+
+    def grow(self):
+        """Double the entity arrays."""
+        capacity = len(self.x) * 2
+        for name in ("x", "y", "cell", "active"):
+            array = getattr(self, name)
+            grown = np.zeros(capacity, dtype=array.dtype)
+            grown[:len(array)] = array
+            setattr(self, name, grown)
+
+    def insert(self, x, y):
+        """
+        Add an entity at a position.
+        :return: The entity ID.
+        """
+        if self.free:
+            entity_id = self.free.pop()
+        else:
+            if self.next_id == len(self.x):
+                self.grow()
+            entity_id = self.next_id
+            self.next_id += 1
+
+        key = self.point_key(x, y)
+        self.x[entity_id] = x
+        self.y[entity_id] = y
+        self.cell[entity_id] = key
+        self.active[entity_id] = True
+        self.cells.setdefault(key, set()).add(entity_id)
+        self.count += 1
+        return entity_id
+
+    def move(self, entity_id, x, y):
+        """Move an entity, changing cells only if it crossed a cell border."""
+        key = self.point_key(x, y)
+        old_key = int(self.cell[entity_id])
+        if key != old_key:
+            self._discard(old_key, entity_id)
+            self.cells.setdefault(key, set()).add(entity_id)
+            self.cell[entity_id] = key
+        self.x[entity_id] = x
+        self.y[entity_id] = y
+
+    def move_many(self, entity_ids, xs, ys):
+        """Move many entities at once; only those that changed cells touch the cell sets."""
+        entity_ids = np.asarray(entity_ids)
+        keys = self.cell_key(np.asarray(xs, dtype=np.float64), np.asarray(ys, dtype=np.float64))
+        changed = np.flatnonzero(keys != self.cell[entity_ids])
+        for entity_id, old_key, key in zip(entity_ids[changed].tolist(), self.cell[entity_ids[changed]].tolist(),
+                                           keys[changed].tolist()):
+            self._discard(old_key, entity_id)
+            self.cells.setdefault(key, set()).add(entity_id)
+        self.cell[entity_ids] = keys
+        self.x[entity_ids] = xs
+        self.y[entity_ids] = ys
+
+    def remove(self, entity_id):
+        """Remove an entity; its ID may be reused by a later insert."""
+        if not self.active[entity_id]:
+            return
+        self._discard(int(self.cell[entity_id]), entity_id)
+        self.active[entity_id] = False
+        self.free.append(entity_id)
+        self.count -= 1
+
+    def _discard(self, key, entity_id):
+        members = self.cells[key]
+        members.discard(entity_id)
+        if not members:
+            del self.cells[key]
+
+    def candidates(self, x1, y1, x2, y2):
+        """Return the IDs of the entities in every cell overlapping a rectangle."""
+        cell_x1 = int(x1 // self.cell_size) + self.KEY_OFFSET
+        cell_y1 = int(y1 // self.cell_size) + self.KEY_OFFSET
+        cell_x2 = int(x2 // self.cell_size) + self.KEY_OFFSET
+        cell_y2 = int(y2 // self.cell_size) + self.KEY_OFFSET
+
+        found = []
+        for cell_y in range(cell_y1, cell_y2 + 1):
+            row = cell_y * self.KEY_STRIDE
+            for cell_x in range(cell_x1, cell_x2 + 1):
+                members = self.cells.get(row + cell_x)
+                if members:
+                    found.extend(members)
+        return np.array(found, dtype=np.int64)
+
+    def query_rect(self, x1, y1, x2, y2):
+        """Return the IDs of the entities inside a rectangle (inclusive)."""
+        ids = self.candidates(x1, y1, x2, y2)
+        inside = (self.x[ids] >= x1) & (self.x[ids] <= x2) & (self.y[ids] >= y1) & (self.y[ids] <= y2)
+        return ids[inside]
+
+    def query_radius(self, x, y, radius):
+        """Return the IDs of the entities within radius of a point."""
+        ids = self.candidates(x - radius, y - radius, x + radius, y + radius)
+        dx = self.x[ids] - x
+        dy = self.y[ids] - y
+        return ids[dx * dx + dy * dy <= radius * radius]
+
+    def query_point(self, x, y, radius=0):
+        """Return the IDs of the entities under a point (e.g. the cursor), nearest first."""
+        ids = self.query_radius(x, y, radius)
+        distance = (self.x[ids] - x) ** 2 + (self.y[ids] - y) ** 2
+        return ids[np.argsort(distance, kind="stable")]
+
+    def query_radius_batch(self, xs, ys, radius):
+        """
+        Radius query for many points at once (e.g. every tower), fully vectorized.
+        The entities are sorted by cell once, then every (query, neighbor cell)
+        pair is resolved with searchsorted.
+        :return: (query_index, entity_id) arrays listing every entity within radius of each point.
+        """
+        xs = np.asarray(xs, dtype=np.float64)
+        ys = np.asarray(ys, dtype=np.float64)
+        empty = np.zeros(0, dtype=np.int64)
+        ids = np.flatnonzero(self.active[:self.next_id])
+        if len(ids) == 0 or len(xs) == 0:
+            return empty, empty
+
+        order = np.argsort(self.cell[ids], kind="stable")
+        sorted_ids = ids[order]
+        sorted_keys = self.cell[sorted_ids]
+
+        # Cell keys of every neighbor cell of every query
+        reach = int(np.ceil(radius / self.cell_size))
+        offsets = np.arange(-reach, reach + 1)
+        offset_keys = (offsets[:, None] * self.KEY_STRIDE + offsets[None, :]).ravel()
+        keys = (self.cell_key(xs, ys)[:, None] + offset_keys[None, :]).ravel()
+        query_of_key = np.repeat(np.arange(len(xs)), len(offset_keys))
+
+        # Range of sorted entities in each of those cells
+        starts = np.searchsorted(sorted_keys, keys, side="left")
+        ends = np.searchsorted(sorted_keys, keys, side="right")
+        counts = ends - starts
+        total = int(counts.sum())
+        if total == 0:
+            return empty, empty
+
+        # Expand the ranges into (query, entity) candidate pairs
+        pair_query = np.repeat(query_of_key, counts)
+        first = np.repeat(starts - np.cumsum(counts) + counts, counts)
+        pair_entity = sorted_ids[first + np.arange(total)]
+
+        dx = self.x[pair_entity] - xs[pair_query]
+        dy = self.y[pair_entity] - ys[pair_query]
+        inside = dx * dx + dy * dy <= radius * radius
+        return pair_query[inside], pair_entity[inside]
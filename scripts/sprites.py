@@ -1,4 +1,16 @@
+import json
+from collections import OrderedDict
+
 import pygame
+import yaml
+
+def rotation_step(angle, steps):
+    """Snap an angle in degrees to the nearest of steps rotations per full turn."""
+    return int(round(angle % 360 * steps / 360)) % steps
+
+def rotate_to_step(image, step, steps):
+    """Rotate an image by a rotation step from rotation_step."""
+    return pygame.transform.rotate(image, step * 360 / steps)
 
 class SpriteSheet:
     def __init__(self, image_path):
@@ -26,10 +38,35 @@ class SpriteSheet:
         return frames
 
 
+class SpriteSheetRegistry:
+    def __init__(self):
+        """Shared SpriteSheets by image path, each decoded on first access."""
+        self.sheets = {}
+
+    def get(self, image_path):
+        """Return the SpriteSheet for an image, decoding it the first time."""
+        sheet = self.sheets.get(image_path)
+        if sheet is None:
+            sheet = SpriteSheet(image_path)
+            self.sheets[image_path] = sheet
+        return sheet
+
+    def is_loaded(self, image_path):
+        return image_path in self.sheets
+
+    def unload(self, image_path):
+        """Release a decoded sheet; it is decoded again on next access."""
+        self.sheets.pop(image_path, None)
+
+
 class Sprite:
     def __init__(self, sprite_id, sprite_sheet, x1, y1, width, height, scale=1.0, 
-                 animated=False, sprites_per_row=1, rows=1, frame_time=None):
-        """Initialize a Sprite with its properties."""
+                 animated=False, sprites_per_row=1, rows=1, frame_time=None, frames=None):
+        """
+        Initialize a Sprite with its properties.
+        If frames (already extracted and scaled, e.g. from the AssetCache) are given,
+        the sprite sheet is not read.
+        """
         self.id = sprite_id
         self.sprite_sheet = sprite_sheet
         self.x1, self.y1 = x1, y1
@@ -39,12 +76,22 @@ class Sprite:
         self.rows = rows
         self.frame_time = frame_time
 
+        # Optional rotation cache, see enable_rotation_cache
+        self.rotation_steps = None
+        self.max_rotations = None
+        self.rotations = OrderedDict()
+
         # Scale the dimensions
         self.scaled_width = int(width * scale)
         self.scaled_height = int(height * scale)
 
         # Extract the image or animation frames
-        if not animated:
+        if frames is not None:
+            if animated:
+                self.frames = list(frames)
+            else:
+                self.image = frames[0]
+        elif not animated:
             self.image = sprite_sheet.subsurface((x1, y1, width, height))
             if scale != 1.0:
                 self.image = pygame.transform.scale(self.image, (self.scaled_width, self.scaled_height))
@@ -60,23 +107,180 @@ class Sprite:
                     self.frames.append(frame_image)
 
     def get_image(self, frame_index=0, angle=0):
-        """Return a specific frame of the sprite, optionally rotated."""
+        """
+        Return a specific frame of the sprite, optionally rotated.
+        With the rotation cache enabled the nearest cached rotation is returned.
+        """
         if self.animated:
-            frame = self.frames[frame_index % len(self.frames)]
-            if angle != 0:
-                return pygame.transform.rotate(frame, angle)
-            return frame
+            frame_index %= len(self.frames)
+            frame = self.frames[frame_index]
         else:
-            if angle != 0:
-                return pygame.transform.rotate(self.image, angle)
-            return self.image
+            frame_index = 0
+            frame = self.image
+
+        if angle == 0:
+            return frame
+        if self.rotation_steps is None:
+            return pygame.transform.rotate(frame, angle)
+        return self.get_rotation(frame_index, frame, angle)
+
+    def enable_rotation_cache(self, steps=64, precompute=False, max_rotations=None):
+        """
+        Cache rotated frames at a fixed angular resolution.
+        :param steps: Number of rotations per full turn (64 gives 5.625 degree steps).
+        :param precompute: Rotate every frame at every step now instead of on first use.
+        :param max_rotations: Maximum number of lazily filled rotations kept (None for no limit).
+        """
+        self.rotation_steps = steps
+        self.max_rotations = max_rotations
+        self.rotations.clear()
+
+        if precompute:
+            for frame_index in range(self.get_frame_count()):
+                frame = self.get_image(frame_index)
+                for step in range(1, steps):
+                    self.rotations[(frame_index, step)] = rotate_to_step(frame, step, steps)
+
+    def disable_rotation_cache(self):
+        """Drop the rotation cache and rotate on every call again."""
+        self.rotation_steps = None
+        self.rotations.clear()
+
+    def get_rotation(self, frame_index, frame, angle):
+        """Return the cached rotation of a frame nearest to the angle, rotating it on first use."""
+        step = rotation_step(angle, self.rotation_steps)
+        if step == 0:
+            return frame
+
+        key = (frame_index, step)
+        image = self.rotations.get(key)
+        if image is not None:
+            self.rotations.move_to_end(key)
+            return image
+
+        image = rotate_to_step(frame, step, self.rotation_steps)
+        self.rotations[key] = image
+
+        # Evict the least recently used rotations
+        if self.max_rotations is not None:
+            while len(self.rotations) > self.max_rotations:
+                self.rotations.popitem(last=False)
+        return image
+
+    def get_frame_count(self):
+        """Return the number of frames in the sprite (1 for static sprites)."""
+        return len(self.frames) if self.animated else 1
 
 
 class SpriteManager:
-    def __init__(self):
+    def __init__(self, zoom_levels=(0.25, 0.5, 1.0, 2.0), scale_step=1 / 32, max_scaled_images=2048):
+        """
+        Initialize the manager.
+        :param zoom_levels: Discrete scales pre-built for every sprite by build_zoom_levels.
+        :param scale_step: Arbitrary scales are snapped to a multiple of this step (the scale bucket).
+        :param max_scaled_images: Maximum number of derived (non zoom level) images kept in the LRU cache.
+        """
         self.sprites = {}  # Dictionary to store sprites by their unique ID
 
-    def add_sprite(self, sprite_id, sprite_sheet, x1, y1, width, height, scale=1.0):
+        # Zoom-level pyramid: (sprite_id, frame, bucket) -> Surface, never evicted
+        self.zoom_levels = sorted(zoom_levels)
+        self.scale_step = scale_step
+        self.zoom_images = {}
+
+        # Images derived from the nearest zoom level, with LRU eviction
+        self.max_scaled_images = max_scaled_images
+        self.scaled_images = OrderedDict()
+
+        # Texture atlases, one per zoom level: bucket -> Surface, and
+        # (sprite_id, frame, bucket) -> Rect of the image inside its atlas
+        self.atlases = {}
+        self.atlas_areas = {}
+
+        # Sprites declared in a manifest and loaded on first use
+        self.sheets = SpriteSheetRegistry()
+        self.asset_cache = None
+        self.definitions = {}  # sprite_id -> manifest entry
+        self.groups = {}  # group -> [sprite_id]
+
+    def load_manifest(self, manifest_path, asset_cache=None):
+        """
+        Declare the sprites of a YAML or JSON manifest without loading them.
+        Each sprite is loaded the first time it is requested (see get_sprite).
+        :param manifest_path: Path of the manifest, with "sheets", "sprites" and "animations".
+        :param asset_cache: Optional AssetCache to load frames through.
+        """
+        with open(manifest_path, "r") as file:
+            if manifest_path.endswith(".json"):
+                manifest = json.load(file)
+            else:
+                manifest = yaml.safe_load(file)
+
+        if asset_cache is not None:
+            self.asset_cache = asset_cache
+        sheets = manifest.get("sheets", {})
+        for animated, key in ((False, "sprites"), (True, "animations")):
+            for entry in manifest.get(key) or []:
+                sprite_id = entry["id"]
+                if sprite_id in self.definitions or sprite_id in self.sprites:
+                    raise ValueError(f"Sprite ID '{sprite_id}' already exists.")
+                definition = dict(entry, animated=animated, path=sheets[entry["sheet"]])
+                self.definitions[sprite_id] = definition
+                self.groups.setdefault(entry.get("group", "default"), []).append(sprite_id)
+
+    def load_sprite(self, sprite_id):
+        """Load a sprite declared in a manifest."""
+        definition = self.definitions[sprite_id]
+        x1, y1 = definition["x"], definition["y"]
+        width, height = definition["width"], definition["height"]
+        scale = definition.get("scale", 1.0)
+        sprites_per_row = definition.get("sprites_per_row", 1)
+        rows = definition.get("rows", 1)
+
+        if self.asset_cache is not None:
+            frames = self.asset_cache.load_frames(definition["path"], x1, y1, width, height,
+                                                  scale, sprites_per_row, rows)
+        else:
+            frames = self.sheets.get(definition["path"]).get_animation_frames(x1, y1, width, height,
+                                                                              sprites_per_row, rows, scale)
+
+        if definition["animated"]:
+            self.add_animation(sprite_id, None, x1, y1, width, height, scale, sprites_per_row, rows,
+                               definition.get("frame_time", 0.1), frames=frames)
+        else:
+            self.add_sprite(sprite_id, None, x1, y1, width, height, scale, frames=frames)
+
+    def load_group(self, group):
+        """Load every not yet loaded sprite of a manifest group."""
+        for sprite_id in self.groups.get(group, []):
+            if sprite_id not in self.sprites:
+                self.load_sprite(sprite_id)
+
+    def unload_group(self, group):
+        """
+        Release the surfaces of a manifest group: its sprites, their scaled images,
+        and sheets no longer used by a loaded sprite. The sprites stay declared and
+        are loaded again on next use. Atlases are repacked without them.
+        """
+        unloaded = {sprite_id for sprite_id in self.groups.get(group, []) if sprite_id in self.sprites}
+        if not unloaded:
+            return
+        for sprite_id in unloaded:
+            del self.sprites[sprite_id]
+        for cache in (self.zoom_images, self.scaled_images):
+            for key in [key for key in cache if key[0] in unloaded]:
+                del cache[key]
+
+        used_paths = {self.definitions[sprite_id]["path"] for sprite_id in self.sprites
+                      if sprite_id in self.definitions}
+        for sprite_id in unloaded:
+            path = self.definitions[sprite_id]["path"]
+            if path not in used_paths:
+                self.sheets.unload(path)
+
+        if self.atlases:
+            self.build_atlas()
+
+    def add_sprite(self, sprite_id, sprite_sheet, x1, y1, width, height, scale=1.0, frames=None):
         """Add a static sprite to the manager."""
         if sprite_id in self.sprites:
             raise ValueError(f"Sprite ID '{sprite_id}' already exists.")
@@ -89,11 +293,12 @@ class SpriteManager:
             width=width,
             height=height,
             scale=scale,
+            frames=frames,
         )
         self.sprites[sprite_id] = sprite
 
     def add_animation(self, sprite_id, sprite_sheet, x1, y1, width, height, scale=1.0, 
-                      sprites_per_row=1, rows=1, frame_time=0.1):
+                      sprites_per_row=1, rows=1, frame_time=0.1, frames=None):
         """Add an animated sprite to the manager."""
         if sprite_id in self.sprites:
             raise ValueError(f"Sprite ID '{sprite_id}' already exists.")
@@ -110,11 +315,144 @@ class SpriteManager:
             sprites_per_row=sprites_per_row,
             rows=rows,
             frame_time=frame_time,
+            frames=frames,
         )
         self.sprites[sprite_id] = animated_sprite
 
     def get_sprite(self, sprite_id):
-        """Retrieve a sprite by its ID."""
-        if sprite_id not in self.sprites:
-            raise ValueError(f"Sprite ID '{sprite_id}' not found.")
-        return self.sprites[sprite_id]
\ No newline at end of file
+        """Retrieve a sprite by its ID, loading it if it is declared in a manifest."""
+        sprite = self.sprites.get(sprite_id)
+        if sprite is None:
+            if sprite_id not in self.definitions:
+                raise ValueError(f"Sprite ID '{sprite_id}' not found.")
+            self.load_sprite(sprite_id)
+            sprite = self.sprites[sprite_id]
+        return sprite
+
+    def enable_rotation_cache(self, sprite_id, steps=64, precompute=False, max_rotations=None):
+        """Enable the rotation cache of a sprite (see Sprite.enable_rotation_cache)."""
+        self.get_sprite(sprite_id).enable_rotation_cache(steps, precompute, max_rotations)
+
+    def scale_bucket(self, scale):
+        """Snap a scale factor to its bucket (an integer multiple of scale_step)."""
+        return max(1, int(round(scale / self.scale_step)))
+
+    def nearest_zoom_level(self, scale):
+        """Return the zoom level to derive a scale from, preferring the smallest level at or above it."""
+        for level in self.zoom_levels:
+            if level >= scale:
+                return level
+        return self.zoom_levels[-1]
+
+    def build_zoom_levels(self):
+        """Pre-build the images of every registered sprite at each zoom level."""
+        for sprite_id, sprite in self.sprites.items():
+            for frame_index in range(sprite.get_frame_count()):
+                for level in self.zoom_levels:
+                    self._build_zoom_image(sprite_id, sprite, frame_index, level)
+        self.scaled_images.clear()
+
+    def build_atlas(self, max_width=2048):
+        """
+        Pack every sprite frame of each zoom level into one atlas Surface per level,
+        so renderers can draw many sprites with a single Surface.blits call.
+        Images are packed into shelves (rows) from tallest to shortest.
+        :param max_width: Maximum width of an atlas in pixels.
+        """
+        self.clear_atlas()
+        for level in self.zoom_levels:
+            bucket = self.scale_bucket(level)
+            images = []
+            for sprite_id, sprite in self.sprites.items():
+                for frame_index in range(sprite.get_frame_count()):
+                    images.append(((sprite_id, frame_index, bucket),
+                                   self.get_scaled_image(sprite_id, frame_index, level)))
+            images.sort(key=lambda item: item[1].get_height(), reverse=True)
+
+            # Assign shelf positions
+            areas = {}
+            x = y = shelf_height = atlas_width = 0
+            for key, image in images:
+                width, height = image.get_size()
+                if x + width > max_width and x > 0:
+                    x, y = 0, y + shelf_height
+                    shelf_height = 0
+                areas[key] = pygame.Rect(x, y, width, height)
+                x += width
+                shelf_height = max(shelf_height, height)
+                atlas_width = max(atlas_width, x)
+
+            atlas = pygame.Surface((max(1, atlas_width), max(1, y + shelf_height)), pygame.SRCALPHA)
+            atlas.blits([(image, areas[key]) for key, image in images], doreturn=False)
+            self.atlases[bucket] = atlas
+            self.atlas_areas.update(areas)
+
+    def clear_atlas(self):
+        """
+        Drop the atlases. Sprites registered after build_atlas are not packed
+        and are drawn from their own images until the atlases are rebuilt.
+        """
+        self.atlases.clear()
+        self.atlas_areas.clear()
+
+    def get_atlas_area(self, sprite_id, frame_index=0, scale=1.0):
+        """
+        Return (atlas, area) for a sprite frame at a zoom level, for use in a
+        Surface.blits sequence as (atlas, dest, area), or None if it is not in an atlas.
+        """
+        bucket = self.scale_bucket(scale)
+        area = self.atlas_areas.get((sprite_id, frame_index, bucket))
+        if area is None:
+            return None
+        return self.atlases[bucket], area
+
+    def _build_zoom_image(self, sprite_id, sprite, frame_index, level):
+        """Scale one frame of a sprite to a zoom level and store it in the pyramid."""
+        key = (sprite_id, frame_index, self.scale_bucket(level))
+        image = sprite.get_image(frame_index)
+        if level != 1.0:
+            width, height = image.get_size()
+            image = pygame.transform.scale(image, (max(1, int(width * level)), max(1, int(height * level))))
+        self.zoom_images[key] = image
+        return image
+
+    def get_scaled_image(self, sprite_id, frame_index=0, scale=1.0):
+        """
+        Return a frame of a sprite scaled by (approximately) the given factor.
+        The scale is snapped to its bucket; zoom levels come from the pyramid and
+        other buckets are derived from the nearest zoom level and cached.
+        :param sprite_id: ID of the sprite.
+        :param frame_index: Frame of an animated sprite.
+        :param scale: Scale factor.
+        """
+        sprite = self.get_sprite(sprite_id)
+        frame_index %= sprite.get_frame_count()
+        bucket = self.scale_bucket(scale)
+        key = (sprite_id, frame_index, bucket)
+
+        image = self.zoom_images.get(key)
+        if image is not None:
+            return image
+
+        image = self.scaled_images.get(key)
+        if image is not None:
+            self.scaled_images.move_to_end(key)
+            return image
+
+        bucket_scale = bucket * self.scale_step
+        level = self.nearest_zoom_level(bucket_scale)
+        source = self.zoom_images.get((sprite_id, frame_index, self.scale_bucket(level)))
+        if source is None:
+            source = self._build_zoom_image(sprite_id, sprite, frame_index, level)
+            if self.scale_bucket(level) == bucket:
+                return source
+
+        width, height = sprite.get_image(frame_index).get_size()
+        size = (max(1, int(width * bucket_scale)), max(1, int(height * bucket_scale)))
+        image = pygame.transform.scale(source, size)
+        self.scaled_images[key] = image
+
+        # Evict the least recently used images
+        while len(self.scaled_images) > self.max_scaled_images:
+            self.scaled_images.popitem(last=False)
+        return image
@@ -0,0 +1,57 @@
+from collections import OrderedDict
+
+import pygame
+
+class TextRenderer:
+    """
+    Text rendering with one Font per size and an LRU cache of rendered text
+    surfaces keyed by (text, size, color), so steady-state frames neither
+    construct fonts nor rasterize glyphs.
+    """
+
+    def __init__(self, font_name=None, max_surfaces=256):
+        """
+        Initialize the renderer.
+        :param font_name: Font file passed to pygame.font.Font, None for the default font.
+        :param max_surfaces: Maximum number of rendered text surfaces kept (LRU).
+        """
+        self.font_name = font_name
+        self.max_surfaces = max_surfaces
+        self.fonts = {}  # size -> Font
+        self.surfaces = OrderedDict()  # (text, size, color) -> Surface
+
+    def get_font(self, size):
+        """Return the Font for a size, creating it on first use."""
+        font = self.fonts.get(size)
+        if font is None:
+            font = self.fonts[size] = pygame.font.Font(self.font_name, size)
+        return font
+
+    def render(self, text, size=36, color=(255, 255, 255)):
+        """Return an antialiased surface of the text, rendering it only if it is not cached."""
+        key = (text, size, tuple(color))
+        surface = self.surfaces.get(key)
+        if surface is not None:
+            self.surfaces.move_to_end(key)
+            return surface
+
+        surface = self.get_font(size).render(text, True, color)
+        self.surfaces[key] = surface
+        while len(self.surfaces) > self.max_surfaces:
+            self.surfaces.popitem(last=False)
+        return surface
+
+    def draw(self, screen, text, pos, size=36, color=(255, 255, 255), center=False):
+        """
+        Draw text on a surface.
+        :param pos: Top-left corner of the text, or its center if center is True.
+        :return: The Rect covered by the text.
+        """
+        surface = self.render(text, size, color)
+        rect = surface.get_rect(center=pos) if center else surface.get_rect(topleft=pos)
+        screen.blit(surface, rect)
+        return rect
+
+    def clear(self):
+        """Drop every cached surface, e.g. after changing the display mode."""
+        self.surfaces.clear()
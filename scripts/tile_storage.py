@@ -0,0 +1,249 @@
+import os
+import threading
+
+import numpy as np
+
+class TileStorage:
+    """
+    2D grid of tile IDs stored as fixed-size square chunks.
+
+    The chunks live in one (chunk_rows, chunk_cols, chunk_size, chunk_size)
+    array, so every chunk is contiguous in memory. Backed by a .npy file through
+    np.memmap, opening even a huge map is instant and only the chunks that are
+    read or written are paged in.
+
+    Supports the 2D indexing World uses on a plain array: storage[row, col],
+    storage[row1:row2, col1:col2] (including steps) for reads and writes,
+    .shape, .dtype and .fill().
+
+    snapshot() captures the tiles copy-on-write for background saving (see
+    TileSnapshot); writes then copy a chunk for the snapshot before changing it.
+    """
+
+    def __init__(self, height, width, chunk_size=64, dtype=np.uint16, path=None):
+        """
+        Initialize the storage.
+        :param height: Height of the grid in tiles.
+        :param width: Width of the grid in tiles.
+        :param chunk_size: Width and height of a chunk in tiles.
+        :param dtype: Tile ID type, uint16 allows 65536 tile IDs.
+        :param path: .npy file to back the storage with; an existing file is opened
+                     as is, a missing one is created. None keeps the tiles in memory.
+        """
+        self.shape = (height, width)
+        self.ndim = 2
+        self.chunk_size = chunk_size
+        self.path = path
+        chunk_shape = (-(-height // chunk_size), -(-width // chunk_size), chunk_size, chunk_size)
+
+        if path is None:
+            self.chunks = np.zeros(chunk_shape, dtype=dtype)
+        elif os.path.exists(path):
+            self.chunks = np.lib.format.open_memmap(path, mode="r+")
+            if self.chunks.shape[:2] != chunk_shape[:2] or self.chunks.shape[2] != self.chunks.shape[3]:
+                raise ValueError(f"Tile file '{path}' does not hold a {width}x{height} map")
+            self.chunk_size = self.chunks.shape[2]
+        else:
+            # The file is created sparse, so even very large maps take no time or disk space up front
+            self.chunks = np.lib.format.open_memmap(path, mode="w+", dtype=dtype, shape=chunk_shape)
+        self.dtype = self.chunks.dtype
+
+        # Snapshots being read by another thread, and the lock guarding chunk writes while there are any
+        self.snapshots = []
+        self.lock = threading.Lock()
+
+    def __len__(self):
+        return self.shape[0]
+
+    def __array__(self, dtype=None, copy=None):
+        tiles = self[:, :]
+        return tiles if dtype is None else tiles.astype(dtype)
+
+    def axis_indices(self, key, axis):
+        """Normalize an int or slice index on one axis to (start, stop, step, is_int)."""
+        size = self.shape[axis]
+        if isinstance(key, slice):
+            return key.indices(size) + (False,)
+        index = int(key)
+        if index < 0:
+            index += size
+        if not 0 <= index < size:
+            raise IndexError(f"Tile index {key} out of range for axis {axis} of size {size}")
+        return index, index + 1, 1, True
+
+    def normalize(self, key):
+        if not isinstance(key, tuple):
+            key = (key, slice(None))
+        if len(key) != 2:
+            raise IndexError("Tile storage takes (row, col) indices")
+        return self.axis_indices(key[0], 0), self.axis_indices(key[1], 1)
+
+    def blocks(self, row1, row2, col1, col2):
+        """
+        Yield (chunk_row, chunk_col, chunk slice, region slice) for every chunk
+        overlapping a step-1 region [row1:row2, col1:col2].
+        """
+        size = self.chunk_size
+        for chunk_row in range(row1 // size, (row2 - 1) // size + 1):
+            top = max(row1, chunk_row * size)
+            bottom = min(row2, (chunk_row + 1) * size)
+            for chunk_col in range(col1 // size, (col2 - 1) // size + 1):
+                left = max(col1, chunk_col * size)
+                right = min(col2, (chunk_col + 1) * size)
+                yield (chunk_row, chunk_col,
+                       (slice(top - chunk_row * size, bottom - chunk_row * size),
+                        slice(left - chunk_col * size, right - chunk_col * size)),
+                       (slice(top - row1, bottom - row1), slice(left - col1, right - col1)))
+
+    def gather_index(self, rows, cols):
+        """Return the 4D fancy index of the tiles at every (row, col) pair of two index ranges."""
+        size = self.chunk_size
+        rows = np.arange(*rows)[:, None]
+        cols = np.arange(*cols)[None, :]
+        return rows // size, cols // size, rows % size, cols % size
+
+    def __getitem__(self, key):
+        (row1, row2, row_step, row_int), (col1, col2, col_step, col_int) = self.normalize(key)
+        if row_int and col_int:
+            size = self.chunk_size
+            return self.chunks[row1 // size, col1 // size, row1 % size, col1 % size]
+
+        if row_step == 1 and col_step == 1:
+            size = self.chunk_size
+            if row2 > row1 and col2 > col1 and \
+                    row1 // size == (row2 - 1) // size and col1 // size == (col2 - 1) // size:
+                # Region inside one chunk: a view, no copy
+                region = self.chunks[row1 // size, col1 // size,
+                                     row1 % size:(row2 - 1) % size + 1, col1 % size:(col2 - 1) % size + 1]
+            else:
+                region = np.empty((max(0, row2 - row1), max(0, col2 - col1)), dtype=self.dtype)
+                if region.size:
+                    for chunk_row, chunk_col, inner, outer in self.blocks(row1, row2, col1, col2):
+                        region[outer] = self.chunks[chunk_row, chunk_col][inner]
+        else:
+            region = self.chunks[self.gather_index((row1, row2, row_step), (col1, col2, col_step))]
+
+        if row_int:
+            return region[0]
+        if col_int:
+            return region[:, 0]
+        return region
+
+    def __setitem__(self, key, value):
+        if not self.snapshots:
+            self.write(key, value)
+            return
+        (row1, row2, row_step, _), (col1, col2, col_step, _) = self.normalize(key)
+        rows = range(row1, row2, row_step)
+        cols = range(col1, col2, col_step)
+        if len(rows) == 0 or len(cols) == 0:
+            return
+        size = self.chunk_size
+        with self.lock:
+            for snapshot in self.snapshots:
+                snapshot.preserve(range(min(rows) // size, max(rows) // size + 1),
+                                  range(min(cols) // size, max(cols) // size + 1))
+            self.write(key, value)
+
+    def write(self, key, value):
+        """Write tiles without preserving them for snapshots, see __setitem__."""
+        (row1, row2, row_step, row_int), (col1, col2, col_step, col_int) = self.normalize(key)
+        if row_int and col_int:
+            size = self.chunk_size
+            self.chunks[row1 // size, col1 // size, row1 % size, col1 % size] = value
+            return
+
+        rows = len(range(row1, row2, row_step))
+        cols = len(range(col1, col2, col_step))
+        if rows == 0 or cols == 0:
+            return
+        value = np.asarray(value)
+        if value.ndim:
+            if row_int:
+                value = value.reshape(1, -1)
+            elif col_int:
+                value = value.reshape(-1, 1)
+            value = np.broadcast_to(value, (rows, cols))
+
+        if row_step == 1 and col_step == 1:
+            for chunk_row, chunk_col, inner, outer in self.blocks(row1, row2, col1, col2):
+                self.chunks[chunk_row, chunk_col][inner] = value[outer] if value.ndim else value
+        else:
+            self.chunks[self.gather_index((row1, row2, row_step), (col1, col2, col_step))] = value
+
+    def fill(self, value):
+        """Set every tile to one ID."""
+        with self.lock:
+            for snapshot in self.snapshots:
+                snapshot.preserve(range(self.chunks.shape[0]), range(self.chunks.shape[1]))
+            self.chunks.fill(value)
+
+    def snapshot(self):
+        """
+        Capture the current tiles without copying them. Release the snapshot
+        when done, so later writes stop preserving chunks for it.
+        :return: A TileSnapshot.
+        """
+        snapshot = TileSnapshot(self)
+        with self.lock:
+            self.snapshots.append(snapshot)
+        return snapshot
+
+    def map_chunks(self, chunks):
+        """
+        Use an existing chunk array as the storage, e.g. a memory-mapped section
+        of a save file, instead of copying it in.
+        :param chunks: Array of shape (chunk_rows, chunk_cols, chunk_size, chunk_size)
+                       matching this storage.
+        """
+        if chunks.shape != self.chunks.shape or chunks.dtype != self.dtype:
+            raise ValueError(f"Chunks of shape {chunks.shape} do not match the tile storage {self.chunks.shape}")
+        with self.lock:
+            # Snapshots keep reading the old array, which is no longer written to
+            self.snapshots.clear()
+            self.chunks = chunks
+
+    def copy(self):
+        """Return the tiles as a dense 2D numpy array."""
+        return self[:, :].copy()
+
+    def flush(self):
+        """Write changed chunks back to the file (memory-mapped storage only)."""
+        if isinstance(self.chunks, np.memmap):
+            self.chunks.flush()
+
+
+class TileSnapshot:
+    """
+    Copy-on-write capture of a TileStorage, for reading from another thread
+    (e.g. a background save) while the game keeps editing tiles. A chunk is
+    only copied when the storage is about to write to it, or when the
+    snapshot reads it, so taking a snapshot costs nothing up front.
+    """
+
+    def __init__(self, storage):
+        self.storage = storage
+        self.chunks = storage.chunks  # Chunk array at the time of the snapshot
+        self.shape = storage.shape
+        self.dtype = storage.dtype
+        self.saved = {}  # (chunk_row, chunk_col) -> chunk as it was when the snapshot was taken
+
+    def preserve(self, chunk_rows, chunk_cols):
+        """Keep a copy of chunks that are about to be written. Called with the storage lock held."""
+        for chunk_row in chunk_rows:
+            for chunk_col in chunk_cols:
+                if (chunk_row, chunk_col) not in self.saved:
+                    self.saved[chunk_row, chunk_col] = self.chunks[chunk_row, chunk_col].copy()
+
+    def get_chunk(self, chunk_row, chunk_col):
+        """Return a copy of one chunk as it was when the snapshot was taken."""
+        with self.storage.lock:
+            chunk = self.saved.get((chunk_row, chunk_col))
+            return chunk if chunk is not None else self.chunks[chunk_row, chunk_col].copy()
+
+    def release(self):
+        """Stop preserving chunks for this snapshot."""
+        with self.storage.lock:
+            if self in self.storage.snapshots:
+                self.storage.snapshots.remove(self)
+        self.saved.clear()
@@ -1,19 +1,40 @@
+from collections import OrderedDict
+import time
+
 import numpy as np
 import pygame
 
+from layers import TileLayer
+
 class World:
-    def __init__(self, width_in_tiles, height_in_tiles, tile_size, win_width, win_height):
-        """Initialize the world dimensions and tiles."""
+    def __init__(self, width_in_tiles, height_in_tiles, tile_size, win_width, win_height,
+                 chunk_size=16, max_cached_chunks=64, tile_path=None, tile_chunk_size=64):
+        """
+        Initialize the world dimensions and tiles.
+        :param tile_path: .npy file to memory-map the tiles from (created if missing), None to keep them in memory.
+        :param tile_chunk_size: Width and height of a tile storage chunk, ideally a multiple of chunk_size.
+        """
         self.width_in_tiles = width_in_tiles
         self.height_in_tiles = height_in_tiles
         self.tile_size = tile_size  # Size of each tile in pixels
 
-        # Create a 2D array to store tile IDs (integers or sprite IDs)
-        self.tiles = np.zeros((height_in_tiles, width_in_tiles), dtype=int)
+        # Named tile layers, drawn in insertion order. The terrain layer holds the
+        # uint16 tile IDs, stored in chunks and indexed like a numpy array
+        self.tile_chunk_size = tile_chunk_size
+        self.layers = OrderedDict()
+        self.layers["terrain"] = TileLayer("terrain", height_in_tiles, width_in_tiles, np.uint16,
+                                           chunk_size=tile_chunk_size, path=tile_path)
+        self.tiles = self.layers["terrain"].tiles
+        self.seed = None  # Seed the terrain was generated from, if any
 
         # Define the player's view window (top-left corner)
         self.world_x = 0
         self.world_y = 0
+        self.scale = 1.0  # Zoom factor the view is clamped for
+
+        # View at the start of the current simulation update, for interpolated rendering
+        self.previous_world_x = 0
+        self.previous_world_y = 0
 
         # Viewport dimensions
         self.viewport_width = win_width  # Hardcoded screen width
@@ -22,30 +43,179 @@ class World:
         # Mini-map visibility toggle
         self.show_minimap = False
 
-        # Mini-map colors
-        self.colors = {
-            "land": (194, 178, 128),  # Sandy brown
-            "water": (173, 216, 230),  # Light blue
-        }
+        # Mini-map cache: an image of the world sampled every minimap_step tiles,
+        # and its scaled 128x128 version
+        self.minimap_size = 128
+        self.minimap_step = max(1, max(width_in_tiles, height_in_tiles) // self.minimap_size)
+        self.minimap_image = None
+        self.minimap_scaled = None
+        self.minimap_dirty = []  # (row1, col1, row2, col2) regions changed since the last update
+        self.minimap_version = 0  # Incremented whenever the scaled mini-map is rebuilt
+        self.minimap_refresh_interval = 0.0  # Minimum seconds between mini-map updates (quality knob)
+        self.minimap_refreshed_at = 0.0
+
+        # Chunked render cache: each chunk is a pre-rendered block of
+        # chunk_size x chunk_size tiles, keyed by (scaled_tile_size, chunk_row, chunk_col)
+        self.chunk_size = chunk_size
+        self.max_cached_chunks = max_cached_chunks
+        self.chunk_cache = OrderedDict()
+        self.chunk_cache_limit = max_cached_chunks
+        self.chunk_tile_to_sprite = None  # Mapping the cached chunks were built with
+        self.chunk_sprite_table = None  # (sprite index per tile ID, sprite names) for that mapping
+
+        # Back buffer holding the last rendered view of the cached layers. Panning
+        # scrolls it and draws only the newly exposed strips (see update_back_buffer)
+        self.back_buffer = None
+        self.back_buffer_view = None  # (view_x, view_y, scaled_tile_size) it was drawn at, None to redraw
+        self.back_buffer_stale = []  # (row1, col1, row2, col2) regions changed since it was drawn
+        self.dynamic_stale = []  # Same for the dynamic layers drawn over it, None for all of them
+
+        # Quality knobs, lowered by the quality governor when frames run over budget
+        self.render_resolution = 1.0  # Fraction of the screen resolution the world is drawn at
+        self.render_target = None  # Surface the world is drawn to below full resolution
+        self.zoom_smoothing = False  # Smooth scale chunks derived between zoom pyramid levels
+
+        # Callables notified with (top_left, bottom_right) whenever tiles change, e.g. flow fields
+        self.listeners = []
+
+        # Tile definition registry, compiled into lookup tables indexed by tile ID
+        self.load_tile_definitions({}, [])
+
+    def load_tile_definitions(self, terrain, tiles):
+        """
+        Compile tile definitions into dense lookup tables indexed by tile ID.
+        The last entry of every table describes unknown tiles, and tile IDs past
+        the end of a table map to it (see tile_attribute).
+        :param terrain: Dictionary of terrain classes to their default attributes:
+                        {"land": {"walkable": True, "buildable": True, "color": [194, 178, 128]}, ...}
+        :param tiles: List of tile definitions, each a dictionary with "id", "terrain",
+                      "sprite" and optionally "walkable", "buildable" and "color"
+                      overriding the terrain class defaults.
+        """
+        size = max([tile["id"] for tile in tiles], default=-1) + 2
+
+        self.terrain_names = ["unknown"] + list(terrain)
+        self.tile_terrain = np.zeros(size, dtype=np.uint8)  # Index into terrain_names
+        self.tile_walkable = np.zeros(size, dtype=bool)
+        self.tile_buildable = np.zeros(size, dtype=bool)
+        self.tile_color = np.zeros((size, 3), dtype=np.uint8)  # Mini-map color, black for unknown
+        self.tile_sprite_index = np.full(size, -1, dtype=np.int16)  # Index into tile_sprite_names
+        self.tile_sprite_names = []
+        self.tile_to_sprite = {}
+
+        for tile in tiles:
+            tile_id = tile["id"]
+            attributes = dict(terrain.get(tile.get("terrain"), {}))
+            attributes.update(tile)
+            if tile.get("terrain") in terrain:
+                self.tile_terrain[tile_id] = self.terrain_names.index(tile["terrain"])
+            self.tile_walkable[tile_id] = attributes.get("walkable", False)
+            self.tile_buildable[tile_id] = attributes.get("buildable", False)
+            self.tile_color[tile_id] = attributes.get("color", (0, 0, 0))
+            sprite_name = attributes.get("sprite")
+            if sprite_name:
+                self.tile_to_sprite[tile_id] = sprite_name
+                if sprite_name not in self.tile_sprite_names:
+                    self.tile_sprite_names.append(sprite_name)
+                self.tile_sprite_index[tile_id] = self.tile_sprite_names.index(sprite_name)
+
+        # Everything rendered from the old tables is stale
+        self.chunk_tile_to_sprite = None
+        self.invalidate_region()
+
+    def tile_attribute(self, table, tiles):
+        """
+        Look up an attribute table for a tile ID or an array of tile IDs in one index.
+        :param table: One of the tile_* lookup tables.
+        :param tiles: Tile ID or array of tile IDs.
+        """
+        return table[np.minimum(tiles, len(table) - 1)]
 
+    def compile_sprite_table(self, tile_to_sprite):
+        """
+        Compile a tile ID to sprite name mapping into (sprite index per tile ID, sprite names).
+        The registry's own mapping is already compiled.
+        """
+        if tile_to_sprite is self.tile_to_sprite:
+            return self.tile_sprite_index, self.tile_sprite_names
+
+        names = sorted(set(tile_to_sprite.values()))
+        table = np.full(max(tile_to_sprite, default=-1) + 2, -1, dtype=np.int16)
+        for tile_id, sprite_name in tile_to_sprite.items():
+            table[tile_id] = names.index(sprite_name)
+        return table, names
+
+    def in_bounds(self, row, col):
+        """Check if a tile position is inside the world."""
+        return 0 <= row < self.height_in_tiles and 0 <= col < self.width_in_tiles
+
+    def get_terrain(self, row, col):
+        """Return the terrain class name of the tile at (row, col)."""
+        return self.terrain_names[self.tile_attribute(self.tile_terrain, self.tiles[row, col])]
+
+    def is_walkable(self, row, col):
+        """Check if the tile at (row, col) can be walked on."""
+        return bool(self.tile_attribute(self.tile_walkable, self.tiles[row, col]))
+
+    def is_buildable(self, top_left, bottom_right=None):
+        """
+        Check if every tile in a rectangle can be built on, in one vectorized pass.
+        :param top_left: (row, col) tuple for the top-left corner of the rectangle.
+        :param bottom_right: (row, col) tuple for the bottom-right corner, or None for a single tile.
+        """
+        row1, col1 = top_left
+        row2, col2 = bottom_right if bottom_right is not None else top_left
+        if not (self.in_bounds(row1, col1) and self.in_bounds(row2, col2)):
+            return False
+        return bool(self.tile_attribute(self.tile_buildable, self.tiles[row1:row2+1, col1:col2+1]).all())
 
-    def fill(self, tile_id):
+    def add_layer(self, name, dtype=np.uint8, static=True, visible=True, colors=None, path=None):
+        """
+        Add a named tile layer drawn above the existing ones (see TileLayer).
+        :return: The new TileLayer.
+        """
+        layer = TileLayer(name, self.height_in_tiles, self.width_in_tiles, dtype, static, visible, colors,
+                          self.tile_chunk_size, path)
+        self.layers[name] = layer
+        if static:
+            self.clear_chunk_cache()
+        return layer
+
+    def get_layer(self, name):
+        """Return the TileLayer with the given name."""
+        return self.layers[name]
+
+    def set_layer_visible(self, name, visible):
+        """Show or hide a layer; hiding a static layer rebuilds the cached chunks."""
+        layer = self.layers[name]
+        if layer.visible != visible:
+            layer.visible = visible
+            if layer.static:
+                self.clear_chunk_cache()
+            else:
+                self.dynamic_stale.append(None)
+
+    def fill(self, tile_id, layer="terrain"):
         """
         Fill the entire world with a single tile.
-        :param tile_id: The ID of the tile to fill the world with.
+        :param tile_id: The ID of the tile (or layer value) to fill the world with.
+        :param layer: Name of the layer to fill.
         """
-        self.tiles.fill(tile_id)
+        self.layers[layer].tiles.fill(tile_id)
+        self.invalidate_region(layer=layer)
 
-    def place_rectangle(self, tile_id, top_left, bottom_right):
+    def place_rectangle(self, tile_id, top_left, bottom_right, layer="terrain"):
         """
         Place a rectangular area of tiles.
-        :param tile_id: The ID of the tile to place.
+        :param tile_id: The ID of the tile (or layer value) to place.
         :param top_left: (row, col) tuple for the top-left corner of the rectangle.
         :param bottom_right: (row, col) tuple for the bottom-right corner of the rectangle.
+        :param layer: Name of the layer to place the tiles on.
         """
         row1, col1 = top_left
         row2, col2 = bottom_right
-        self.tiles[row1:row2+1, col1:col2+1] = tile_id
+        self.layers[layer].tiles[row1:row2+1, col1:col2+1] = tile_id
+        self.invalidate_region(top_left, bottom_right, layer)
 
     def place_lake(self, top_left, bottom_right, tile_ids):
         """
@@ -87,123 +257,490 @@ class World:
         # Fill the center
         if row2 > row1 + 1 and col2 > col1 + 1:
             self.tiles[row1+1:row2, col1+1:col2] = tile_ids["mm"]  # Center
-        
-        
 
-    def populate(self, tile_mapping):
+        self.invalidate_region(top_left, bottom_right)
+
+
+    def populate(self, tile_mapping, seed=None):
         """
         Populate the world with tiles using probabilities.
         :param tile_mapping: A dictionary mapping tile IDs to probabilities.
                              Example: {1: 0.5, 2: 0.5} for ground and water.
+        :param seed: Seed for numpy.random.default_rng, None for a fresh one.
         """
         tile_ids = list(tile_mapping.keys())
         probabilities = list(tile_mapping.values())
         # Randomly assign tiles based on the probabilities
-        self.tiles = np.random.choice(tile_ids, size=self.tiles.shape, p=probabilities)
+        rng = np.random.default_rng(seed)
+        self.tiles[:, :] = rng.choice(tile_ids, size=self.tiles.shape, p=probabilities)
+        self.seed = seed
+        self.invalidate_region()
+
+    def load_tiles(self, tiles, seed=None):
+        """
+        Replace every terrain tile, e.g. with a generated or imported map.
+        :param tiles: 2D array of tile IDs the size of the world.
+        :param seed: Seed the map was generated from, if any.
+        """
+        self.tiles[:, :] = tiles
+        self.seed = seed
+        self.invalidate_region()
+
+    def invalidate_region(self, top_left=None, bottom_right=None, layer="terrain"):
+        """
+        Mark a rectangle of tiles as changed so cached chunks covering it are rebuilt.
+        Call this after writing to self.tiles (or a layer) directly.
+        :param top_left: (row, col) tuple for the top-left corner, or None for the whole world.
+        :param bottom_right: (row, col) tuple for the bottom-right corner, or None for the whole world.
+        :param layer: Name of the layer that changed. Only terrain edits reach the
+                      mini-map and listeners; dynamic layers are not cached at all.
+        """
+        if layer == "terrain":
+            for listener in self.listeners:
+                listener(top_left, bottom_right)
+        elif not self.layers[layer].static:
+            # Not cached, only tracked so the screen area gets presented
+            self.dynamic_stale.append(None if top_left is None or bottom_right is None else
+                                      (top_left[0], top_left[1], bottom_right[0], bottom_right[1]))
+            return
+
+        if top_left is None or bottom_right is None:
+            self.clear_chunk_cache()
+            if layer == "terrain":
+                self.minimap_image = None
+            return
+
+        if layer == "terrain":
+            self.minimap_dirty.append((top_left[0], top_left[1], bottom_right[0], bottom_right[1]))
+        self.back_buffer_stale.append((top_left[0], top_left[1], bottom_right[0], bottom_right[1]))
+
+        chunk_row1 = top_left[0] // self.chunk_size
+        chunk_col1 = top_left[1] // self.chunk_size
+        chunk_row2 = bottom_right[0] // self.chunk_size
+        chunk_col2 = bottom_right[1] // self.chunk_size
+        for key in list(self.chunk_cache):
+            _, chunk_row, chunk_col = key
+            if chunk_row1 <= chunk_row <= chunk_row2 and chunk_col1 <= chunk_col <= chunk_col2:
+                del self.chunk_cache[key]
+
+    def clear_chunk_cache(self):
+        """Drop every cached chunk, and redraw the back buffer built from them."""
+        self.chunk_cache.clear()
+        self.back_buffer_view = None
+
+    def add_listener(self, listener):
+        """Call listener(top_left, bottom_right) whenever a region of tiles changes (None, None for all)."""
+        self.listeners.append(listener)
+
+    def remove_listener(self, listener):
+        """Stop notifying a listener added with add_listener."""
+        if listener in self.listeners:
+            self.listeners.remove(listener)
 
     def set_view(self, world_x, world_y):
         """
         Update the top-left corner of the player's view.
         Clamp values to ensure they stay within bounds.
         """
-        max_x = (self.width_in_tiles * self.tile_size) - self.viewport_width
-        max_y = (self.height_in_tiles * self.tile_size) - self.viewport_height
+        max_x = (self.width_in_tiles * self.tile_size) - self.viewport_width / self.scale
+        max_y = (self.height_in_tiles * self.tile_size) - self.viewport_height / self.scale
         self.world_x = max(0, min(world_x, max_x))
         self.world_y = max(0, min(world_y, max_y))
 
-    def render_map(self, screen):
+    def get_scaled_tile_size(self, scale):
+        """Size of a tile in whole pixels at a zoom factor, as the map is drawn."""
+        return int(self.tile_size * scale + 1e-9)  # Absorb rounding error in snapped scales
+
+    def snap_scale(self, scale):
         """
-        Render a mini-map of the world in the top-right corner of the screen.
+        Round a zoom factor down to the one the map is actually drawn at, a whole
+        number of pixels per tile, so picking, effects and clamping line up with it.
         """
-        # Mini-map dimensions
-        map_width = self.width_in_tiles
-        map_height = self.height_in_tiles
-        map_surface = pygame.Surface((map_width, map_height))
-
-        # Set alpha for transparency (0 is fully transparent, 255 is fully opaque)
-        alpha_value = 120  # Example: Semi-transparent
-        map_surface.set_alpha(alpha_value)
-    
-
-        # Fill the map based on tile types
-        for row in range(self.height_in_tiles):
-            for col in range(self.width_in_tiles):
-                tile_id = self.tiles[row, col]
-                if tile_id < 200: #== 1:  # Land tile
-                    color = self.colors["land"]
-                elif tile_id < 300: #>= 2:  # Water tiles
-                    color = self.colors["water"]
-                else:
-                    color = (0, 0, 0)  # Default black for uninitialized
-                map_surface.set_at((col, row), color)
+        return max(1, self.get_scaled_tile_size(scale)) / self.tile_size
+
+    def set_scale(self, scale, anchor=(0, 0)):
+        """
+        Change the zoom factor, keeping the world point under the anchor fixed on screen.
+        :param scale: New zoom factor, rounded with snap_scale.
+        :param anchor: (x, y) screen position to zoom around, e.g. the mouse position.
+        """
+        scale = self.snap_scale(scale)
+        anchor_x, anchor_y = anchor
+        world_x = self.world_x + anchor_x / self.scale - anchor_x / scale
+        world_y = self.world_y + anchor_y / self.scale - anchor_y / scale
+        self.scale = scale
+        self.set_view(world_x, world_y)
+        self.begin_update()  # Do not interpolate across a zoom
+
+    def begin_update(self):
+        """Remember the current view as the start of a fixed simulation update."""
+        self.previous_world_x = self.world_x
+        self.previous_world_y = self.world_y
+
+    def get_view(self, alpha=1.0):
+        """
+        Return the view position interpolated between the previous and current update.
+        :param alpha: Fraction of an update elapsed since the last one (0.0 to 1.0).
+        """
+        if alpha >= 1.0:
+            return self.world_x, self.world_y
+        return (self.previous_world_x + (self.world_x - self.previous_world_x) * alpha,
+                self.previous_world_y + (self.world_y - self.previous_world_y) * alpha)
 
-        # Scale the mini-map to fit within a border
-        map_surface = pygame.transform.scale(map_surface, (128, 128))
+    def tile_colors(self, tiles):
+        """Map an array of tile IDs to an array of mini-map colors in one pass."""
+        return self.tile_attribute(self.tile_color, tiles)
+
+    def update_minimap(self):
+        """
+        Bring the cached mini-map images up to date, redrawing only the rows and
+        columns of the regions that changed since the last update.
+        """
+        step = self.minimap_step
+        if self.minimap_image is None:
+            sampled = self.tiles[::step, ::step]
+            self.minimap_image = pygame.Surface((sampled.shape[1], sampled.shape[0]))
+            pygame.surfarray.blit_array(self.minimap_image, self.tile_colors(sampled).transpose(1, 0, 2))
+            self.minimap_dirty.clear()
+            self.minimap_scaled = None
+        elif self.minimap_dirty:
+            pixels = pygame.surfarray.pixels3d(self.minimap_image)
+            for row1, col1, row2, col2 in self.minimap_dirty:
+                # Sampled rows/columns that fall inside the changed region
+                first_row, last_row = -(-row1 // step), row2 // step
+                first_col, last_col = -(-col1 // step), col2 // step
+                if first_row > last_row or first_col > last_col:
+                    continue
+                sampled = self.tiles[first_row * step:last_row * step + 1:step,
+                                     first_col * step:last_col * step + 1:step]
+                pixels[first_col:last_col + 1, first_row:last_row + 1] = \
+                    self.tile_colors(sampled).transpose(1, 0, 2)
+            del pixels  # Unlock the surface
+            self.minimap_dirty.clear()
+            self.minimap_scaled = None
+
+        if self.minimap_scaled is None:
+            # Scale the mini-map to fit within a border
+            self.minimap_scaled = pygame.transform.scale(self.minimap_image,
+                                                         (self.minimap_size, self.minimap_size))
+
+            # Set alpha for transparency (0 is fully transparent, 255 is fully opaque)
+            alpha_value = 120  # Example: Semi-transparent
+            self.minimap_scaled.set_alpha(alpha_value)
+            self.minimap_version += 1
+
+    def render_map(self, screen, dirty=None):
+        """
+        Render a mini-map of the world in the top-right corner of the screen.
+        :param dirty: DirtyRects to register the mini-map with, if any.
+        """
+        now = time.perf_counter()
+        if self.minimap_scaled is None or now - self.minimap_refreshed_at >= self.minimap_refresh_interval:
+            self.update_minimap()
+            self.minimap_refreshed_at = now
+        size = self.minimap_size
 
         # Draw border for the mini-map
-        border_rect = pygame.Rect(screen.get_width() - 138, 10, 128 + 10, 128 + 10)
+        border_rect = pygame.Rect(screen.get_width() - size - 10, 10, size + 10, size + 10)
         pygame.draw.rect(screen, (50, 50, 50), border_rect)
 
         # Blit the mini-map onto the screen
-        screen.blit(map_surface, (screen.get_width() - 133, 15))
+        screen.blit(self.minimap_scaled, (screen.get_width() - size - 5, 15))
 
         # Draw the viewport rectangle
-        viewport_col = int(self.world_x / self.tile_size / self.width_in_tiles * 128)
-        viewport_row = int(self.world_y / self.tile_size / self.height_in_tiles * 128)
-        viewport_width = int(self.viewport_width / self.tile_size / self.width_in_tiles * 128)
-        viewport_height = int(self.viewport_height / self.tile_size / self.height_in_tiles * 128)
+        viewport_col = int(self.world_x / self.tile_size / self.width_in_tiles * size)
+        viewport_row = int(self.world_y / self.tile_size / self.height_in_tiles * size)
+        viewport_width = int(self.viewport_width / self.scale / self.tile_size / self.width_in_tiles * size)
+        viewport_height = int(self.viewport_height / self.scale / self.tile_size / self.height_in_tiles * size)
 
         pygame.draw.rect(
             screen,
             (255, 0, 0),
             pygame.Rect(
-                screen.get_width() - 133 + viewport_col,
+                screen.get_width() - size - 5 + viewport_col,
                 15 + viewport_row,
                 viewport_width,
                 viewport_height,
             ),
             1,
         )
+        if dirty is not None:
+            dirty.add_overlay(border_rect, (self.minimap_version, viewport_col, viewport_row,
+                                            viewport_width, viewport_height))
 
     def toggle_minimap(self):
         """Toggle the visibility of the mini-map."""
         self.show_minimap = not self.show_minimap
         # print(f"Mini-map visibility: {self.show_minimap}")
             
-    def render(self, screen, sprite_manager, tile_to_sprite, scale=1.0):
+    def render(self, screen, sprite_manager, tile_to_sprite, scale=1.0, alpha=1.0, dirty=None):
         """
-        Render the visible portion of the world.
+        Render the visible portion of the world from the back buffer and chunk cache.
+        Below full render_resolution the world is drawn to a smaller surface and
+        scaled up to the screen in one pass.
         :param screen: Pygame screen to render on.
         :param sprite_manager: SpriteManager to fetch and render sprites.
-        :param tile_to_sprite: Mapping of tile IDs to sprite names.
-        :param scale: Scale factor for rendering.
+        :param tile_to_sprite: Mapping of tile IDs to sprite names, e.g. self.tile_to_sprite.
+        :param scale: Scale factor for rendering, normally self.scale (see snap_scale).
+        :param alpha: Interpolation between the previous and current view (see get_view).
+        :param dirty: DirtyRects to register the changed parts of the screen with, if any.
         """
-        scaled_tile_size = int(self.tile_size * scale)
-
-        # Calculate the range of tiles visible in the window
-        start_col = int(self.world_x) // self.tile_size
-        start_row = int(self.world_y) // self.tile_size
-        end_col = (int(self.world_x) + screen.get_width()) // self.tile_size + 1
-        end_row = (int(self.world_y) + screen.get_height()) // self.tile_size + 1
-
-        # Offset to adjust tile positions on the screen
-        x_offset = -(int(self.world_x) % self.tile_size) * scale
-        y_offset = -(int(self.world_y) % self.tile_size) * scale
-
-        # Render each visible tile
-        for row in range(start_row, min(end_row, self.height_in_tiles)):
-            for col in range(start_col, min(end_col, self.width_in_tiles)):
-                tile_id = self.tiles[row, col]
-                sprite_name = tile_to_sprite.get(tile_id)
-                if sprite_name:
-                    sprite = sprite_manager.get_sprite(sprite_name)
-                    if sprite:
-                        scaled_sprite = pygame.transform.scale(sprite.get_image(), 
-                                                               (scaled_tile_size, scaled_tile_size))
-                        screen.blit(scaled_sprite, 
-                                    (x_offset + (col - start_col) * scaled_tile_size,
-                                     y_offset + (row - start_row) * scaled_tile_size))
+        scaled_tile_size = self.get_scaled_tile_size(scale)
+        render_tile_size = int(scaled_tile_size * self.render_resolution)
+        if self.render_resolution >= 1.0 or render_tile_size <= 0:
+            rects = self.render_view(screen, sprite_manager, tile_to_sprite, scaled_tile_size, alpha)
+        else:
+            # Size the target from the tile sizes so the scaled up world lines up with the screen
+            factor = render_tile_size / scaled_tile_size
+            size = (-(-screen.get_width() * render_tile_size // scaled_tile_size),
+                    -(-screen.get_height() * render_tile_size // scaled_tile_size))
+            if self.render_target is None or self.render_target.get_size() != size:
+                self.render_target = pygame.Surface(size)
+                if pygame.display.get_surface() is not None:
+                    self.render_target = self.render_target.convert()
+            rects = self.render_view(self.render_target, sprite_manager, tile_to_sprite, render_tile_size, alpha)
+            pygame.transform.scale(self.render_target, screen.get_size(), screen)
+            rects = [pygame.Rect(int(rect.x / factor) - 1, int(rect.y / factor) - 1,
+                                 int(rect.width / factor) + 3, int(rect.height / factor) + 3) for rect in rects]
+
+        if dirty is not None:
+            for rect in rects:
+                dirty.add(rect)
+
+    def render_view(self, screen, sprite_manager, tile_to_sprite, scaled_tile_size, alpha=1.0):
+        """
+        Draw the world at a tile size, see render.
+        :return: The rectangles of the surface that changed since the last call.
+        """
+        if scaled_tile_size <= 0:
+            return []
+
+        # Cached chunks are only valid for the mapping they were built with
+        if tile_to_sprite is not self.chunk_tile_to_sprite:
+            self.clear_chunk_cache()
+            self.chunk_tile_to_sprite = tile_to_sprite
+            self.chunk_sprite_table = self.compile_sprite_table(tile_to_sprite)
+
+        # View position in scaled pixels
+        world_x, world_y = self.get_view(alpha)
+        view_x = int(world_x) * scaled_tile_size // self.tile_size
+        view_y = int(world_y) * scaled_tile_size // self.tile_size
+        chunk_pixels = self.chunk_size * scaled_tile_size
+
+        # Keep at least a few screens worth of chunks so zooming does not thrash the cache
+        visible_chunks = ((screen.get_width() // chunk_pixels + 2) *
+                          (screen.get_height() // chunk_pixels + 2))
+        self.chunk_cache_limit = max(self.max_cached_chunks, 3 * visible_chunks)
+
+        # Bring the back buffer up to date with the view, then present it in one blit
+        regions = self.update_back_buffer(screen.get_size(), view_x, view_y, scaled_tile_size,
+                                          sprite_manager, tile_to_sprite)
+        screen.blit(self.back_buffer, (0, 0))
+        for region in self.dynamic_stale:
+            if region is None:
+                regions.append(screen.get_rect())
+            else:
+                row1, col1, row2, col2 = region
+                regions.append(pygame.Rect(col1 * scaled_tile_size - view_x, row1 * scaled_tile_size - view_y,
+                                           (col2 - col1 + 1) * scaled_tile_size,
+                                           (row2 - row1 + 1) * scaled_tile_size))
+        self.dynamic_stale.clear()
+
+        # Dynamic layers are not cached: draw their visible tiles over the chunks
+        dynamic_layers = [layer for layer in self.layers.values() if layer.visible and not layer.static]
+        if dynamic_layers:
+            row1 = view_y // scaled_tile_size
+            col1 = view_x // scaled_tile_size
+            row2 = min((view_y + screen.get_height()) // scaled_tile_size + 1, self.height_in_tiles)
+            col2 = min((view_x + screen.get_width()) // scaled_tile_size + 1, self.width_in_tiles)
+            dest = (col1 * scaled_tile_size - view_x, row1 * scaled_tile_size - view_y)
+            for layer in dynamic_layers:
+                block = layer.tiles[row1:row2, col1:col2]
+                if layer.is_color_layer():
+                    layer.draw_colors(screen, block, dest, scaled_tile_size)
+                else:
+                    self.draw_sprite_tiles(screen, block, dest, scaled_tile_size, sprite_manager)
+        return regions
 
+    def update_back_buffer(self, size, view_x, view_y, scaled_tile_size, sprite_manager, tile_to_sprite):
+        """
+        Bring the back buffer up to date with the view. When the view moved by
+        less than a screen at the same zoom, the buffer is scrolled by the delta
+        and only the newly exposed rows and columns are drawn; a zoom, teleport
+        or cache invalidation redraws it entirely.
+        :param size: (width, height) of the screen.
+        :param view_x: Left edge of the view in scaled pixels.
+        :param view_y: Top edge of the view in scaled pixels.
+        :param scaled_tile_size: Size of each tile in pixels.
+        :param sprite_manager: SpriteManager to fetch sprites.
+        :param tile_to_sprite: Mapping of tile IDs to sprite names.
+        :return: The screen rectangles that changed: the whole screen after a scroll
+                 (every pixel moved), otherwise the redrawn regions.
+        """
+        width, height = size
+        if self.back_buffer is None or self.back_buffer.get_size() != size:
+            self.back_buffer = pygame.Surface(size)
+            if pygame.display.get_surface() is not None:
+                self.back_buffer = self.back_buffer.convert()
+            self.back_buffer_view = None
+
+        regions = []
+        scrolled = False
+        if self.back_buffer_view is None or self.back_buffer_view[2] != scaled_tile_size or \
+                abs(view_x - self.back_buffer_view[0]) >= width or abs(view_y - self.back_buffer_view[1]) >= height:
+            regions.append(pygame.Rect(0, 0, width, height))
+        else:
+            dx = view_x - self.back_buffer_view[0]
+            dy = view_y - self.back_buffer_view[1]
+            if dx or dy:
+                self.back_buffer.scroll(-dx, -dy)
+                scrolled = True
+            if dx > 0:
+                regions.append(pygame.Rect(width - dx, 0, dx, height))
+            elif dx < 0:
+                regions.append(pygame.Rect(0, 0, -dx, height))
+            if dy > 0:
+                regions.append(pygame.Rect(0, height - dy, width, dy))
+            elif dy < 0:
+                regions.append(pygame.Rect(0, 0, width, -dy))
+
+            # Tiles edited since the last frame
+            screen_rect = pygame.Rect(0, 0, width, height)
+            for row1, col1, row2, col2 in self.back_buffer_stale:
+                rect = pygame.Rect(col1 * scaled_tile_size - view_x, row1 * scaled_tile_size - view_y,
+                                   (col2 - col1 + 1) * scaled_tile_size, (row2 - row1 + 1) * scaled_tile_size)
+                rect = rect.clip(screen_rect)
+                if rect.width and rect.height:
+                    regions.append(rect)
+
+        for rect in regions:
+            self.draw_back_buffer_region(rect, view_x, view_y, scaled_tile_size, sprite_manager, tile_to_sprite)
+        self.back_buffer_view = (view_x, view_y, scaled_tile_size)
+        self.back_buffer_stale.clear()
+        if scrolled:
+            return [pygame.Rect(0, 0, width, height)]
+        return regions
+
+    def draw_back_buffer_region(self, rect, view_x, view_y, scaled_tile_size, sprite_manager, tile_to_sprite):
+        """
+        Redraw a rectangle of the back buffer from the chunk cache, clipped to the rectangle.
+        :param rect: Screen rectangle to redraw.
+        :param view_x: Left edge of the view in scaled pixels.
+        :param view_y: Top edge of the view in scaled pixels.
+        """
+        chunk_pixels = self.chunk_size * scaled_tile_size
+        chunks_wide = (self.width_in_tiles + self.chunk_size - 1) // self.chunk_size
+        chunks_high = (self.height_in_tiles + self.chunk_size - 1) // self.chunk_size
+        start_chunk_col = max((view_x + rect.left) // chunk_pixels, 0)
+        start_chunk_row = max((view_y + rect.top) // chunk_pixels, 0)
+        end_chunk_col = min((view_x + rect.right - 1) // chunk_pixels + 1, chunks_wide)
+        end_chunk_row = min((view_y + rect.bottom - 1) // chunk_pixels + 1, chunks_high)
+
+        # Blit the chunks under the rectangle in one batch; the clip keeps the rest of the buffer
+        self.back_buffer.set_clip(rect)
+        self.back_buffer.fill((0, 0, 0), rect)  # Outside the world
+        self.back_buffer.blits([(self.get_chunk(chunk_row, chunk_col, scaled_tile_size, sprite_manager, tile_to_sprite),
+                                 (chunk_col * chunk_pixels - view_x, chunk_row * chunk_pixels - view_y))
+                                for chunk_row in range(start_chunk_row, end_chunk_row)
+                                for chunk_col in range(start_chunk_col, end_chunk_col)], doreturn=False)
+        self.back_buffer.set_clip(None)
+
+    def get_chunk(self, chunk_row, chunk_col, scaled_tile_size, sprite_manager, tile_to_sprite):
+        """
+        Return the pre-rendered Surface for a chunk, building it if it is not cached.
+        :param chunk_row: Row of the chunk (in chunks).
+        :param chunk_col: Column of the chunk (in chunks).
+        :param scaled_tile_size: Size of each tile in the chunk, in pixels.
+        :param sprite_manager: SpriteManager to fetch sprites.
+        :param tile_to_sprite: Mapping of tile IDs to sprite names.
+        """
+        key = (scaled_tile_size, chunk_row, chunk_col)
+        chunk = self.chunk_cache.get(key)
+        if chunk is not None:
+            self.chunk_cache.move_to_end(key)
+            return chunk
+
+        # Scales between zoom levels are derived from the nearest level's chunk
+        # with a single transform instead of re-blitting every tile
+        level = sprite_manager.nearest_zoom_level(scaled_tile_size / self.tile_size)
+        level_tile_size = int(self.tile_size * level)
+        if level_tile_size != scaled_tile_size and level_tile_size > 0:
+            source = self.get_chunk(chunk_row, chunk_col, level_tile_size,
+                                    sprite_manager, tile_to_sprite)
+            width = source.get_width() // level_tile_size * scaled_tile_size
+            height = source.get_height() // level_tile_size * scaled_tile_size
+            if self.zoom_smoothing:
+                chunk = pygame.transform.smoothscale(source, (width, height))
+            else:
+                chunk = pygame.transform.scale(source, (width, height))
+        else:
+            chunk = self.build_chunk(chunk_row, chunk_col, scaled_tile_size,
+                                     sprite_manager, tile_to_sprite)
+        self.chunk_cache[key] = chunk
+
+        # Evict the least recently used chunks
+        while len(self.chunk_cache) > self.chunk_cache_limit:
+            self.chunk_cache.popitem(last=False)
+        return chunk
+
+    def build_chunk(self, chunk_row, chunk_col, scaled_tile_size, sprite_manager, tile_to_sprite):
+        """
+        Render the tiles of one chunk to a new Surface, compositing every visible static layer.
+        :param chunk_row: Row of the chunk (in chunks).
+        :param chunk_col: Column of the chunk (in chunks).
+        :param scaled_tile_size: Size of each tile in the chunk, in pixels.
+        :param sprite_manager: SpriteManager to fetch sprites.
+        :param tile_to_sprite: Mapping of tile IDs to sprite names.
+        """
+        row1 = chunk_row * self.chunk_size
+        col1 = chunk_col * self.chunk_size
+        row2 = min(row1 + self.chunk_size, self.height_in_tiles)
+        col2 = min(col1 + self.chunk_size, self.width_in_tiles)
+
+        chunk = pygame.Surface(((col2 - col1) * scaled_tile_size, (row2 - row1) * scaled_tile_size))
+        for layer in self.layers.values():
+            if not (layer.visible and layer.static):
+                continue
+            block = layer.tiles[row1:row2, col1:col2]
+            if layer.is_color_layer():
+                layer.draw_colors(chunk, block, (0, 0), scaled_tile_size)
+            else:
+                self.draw_sprite_tiles(chunk, block, (0, 0), scaled_tile_size, sprite_manager)
+        return chunk
+
+    def draw_sprite_tiles(self, surface, block, dest, scaled_tile_size, sprite_manager):
+        """
+        Draw a block of tile IDs with their sprites using a single blits call.
+        :param surface: Surface to draw on.
+        :param block: 2D array of tile IDs; IDs without a sprite are skipped.
+        :param dest: (x, y) position of the block's top-left tile on the surface.
+        :param scaled_tile_size: Size of each tile in pixels.
+        :param sprite_manager: SpriteManager to fetch sprites.
+        """
+        # Map the whole block to sprite indices in one lookup
+        sprite_table, sprite_names = self.chunk_sprite_table
+        sprite_indices = self.tile_attribute(sprite_table, block)
+
+        # Look up each sprite once per block rather than once per tile, as an
+        # (atlas, area) pair when the sprite is packed in the atlas for this scale
+        scale = scaled_tile_size / self.tile_size
+        sources = {}
+        for sprite_index in np.unique(sprite_indices):
+            if sprite_index >= 0:
+                sprite_name = sprite_names[sprite_index]
+                image = sprite_manager.get_scaled_image(sprite_name, 0, scale)
+                if image.get_size() != (scaled_tile_size, scaled_tile_size):
+                    sources[sprite_index] = (pygame.transform.scale(image, (scaled_tile_size, scaled_tile_size)), None)
+                else:
+                    sources[sprite_index] = sprite_manager.get_atlas_area(sprite_name, 0, scale) or (image, None)
+
+        x, y = dest
+        rows, cols = np.nonzero(sprite_indices >= 0)
+        surface.blits([(sources[sprite_index][0], (x + col * scaled_tile_size, y + row * scaled_tile_size),
+                        sources[sprite_index][1])
+                       for row, col, sprite_index in zip(rows.tolist(), cols.tolist(),
+                                                         sprite_indices[rows, cols].tolist())],
+                      doreturn=False)
             
     # def render(self, screen, sprite_manager, tile_to_sprite):
         # """